@@ -0,0 +1,96 @@
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.synthetic import synthetic_frames
+from src.database import (
+    METRICS,
+    _create_tables,
+    build_countries_query,
+    build_latest_totals_query,
+    build_top_countries_query,
+    build_trend_query,
+    make_connection,
+    refresh_aggregates
+)
+from src.sync_data import COVID_DATA_COLUMNS, UPSERT_COLUMNS, iter_covid_rows, reshape_covid_data
+
+TABLES = ("covid_data", "covid_daily_country", "covid_daily_global", "covid_country_latest", "sync_checkpoint", "data_version")
+
+
+def dashboard_queries(country: str):
+    # The dashboard's reads, against the aggregate tables and as raw covid_data scans
+    queries = {}
+    for raw in (False, True):
+        suffix = "_raw" if raw else ""
+        queries[f"totals{suffix}"] = build_latest_totals_query(raw)
+        queries[f"countries{suffix}"] = build_countries_query(raw)
+        for metric in METRICS:
+            queries[f"trend_global_{metric}{suffix}"] = build_trend_query(metric, None, raw)
+            queries[f"trend_country_{metric}{suffix}"] = build_trend_query(metric, country, raw)
+            queries[f"top_{metric}{suffix}"] = build_top_countries_query(metric, 15, raw)
+    return queries
+
+
+def run_backend(backend: str, frame, repeat: int, chunk_size: int, **kwargs):
+    with make_connection(backend, **kwargs) as db:
+        cursor = db.connection.cursor()
+        for table in TABLES:
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        db.connection.commit()
+        cursor.close()
+        _create_tables(db)
+
+        results = {}
+        start = time.perf_counter()
+        db.bulk_insert("covid_data", COVID_DATA_COLUMNS, iter_covid_rows(frame), chunk_size=chunk_size, update_columns=UPSERT_COLUMNS)
+        results["load"] = time.perf_counter() - start
+        start = time.perf_counter()
+        refresh_aggregates(db)
+        results["refresh_aggregates"] = time.perf_counter() - start
+
+        country = frame["country"].iloc[0]
+        for name, (query, params) in dashboard_queries(country).items():
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                db.fetch_frame(query, params)
+                timings.append(time.perf_counter() - start)
+            results[name] = float(np.median(timings))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load, aggregate and dashboard query times per storage backend on the same synthetic data")
+    parser.add_argument("--regions", type=int, default=280)
+    parser.add_argument("--dates", type=int, default=1140)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mysql", action="store_true", help="also run against MySQL")
+    parser.add_argument("--mysql-database", default="covid19_bench", help="existing MySQL database to (re)create the tables in")
+    args = parser.parse_args()
+
+    print(f"Generating {args.regions} regions x {args.dates} dates...")
+    frames = synthetic_frames(args.regions, args.dates, args.seed)
+    frame = reshape_covid_data(frames["confirmed"], frames["deaths"], frames["recovered"])
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        print("Running SQLite...")
+        results["sqlite"] = run_backend("sqlite", frame, args.repeat, args.chunk_size, path=str(Path(tmp) / "bench.sqlite"))
+    if args.mysql:
+        print("Running MySQL...")
+        results["mysql"] = run_backend("mysql", frame, args.repeat, args.chunk_size, database=args.mysql_database)
+
+    backends = list(results)
+    print(f"\n{'step (median ms)':>32} " + " ".join(f"{name:>10}" for name in backends))
+    for step in results[backends[0]]:
+        print(f"{step:>32} " + " ".join(f"{results[name][step] * 1000:>10.1f}" for name in backends))
+
+
+if __name__ == "__main__":
+    main()
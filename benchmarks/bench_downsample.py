@@ -0,0 +1,53 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.dashboard import trend_figure, trend_point_budget
+from src.downsample import downsample_frame
+
+
+def synthetic_series(n_points: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    daily = rng.poisson(lam=np.linspace(10, 5000, n_points))
+    return pd.DataFrame({
+        "date": pd.date_range("2020-01-22", periods=n_points, freq="D"),
+        "confirmed": np.cumsum(daily)
+    })
+
+
+def measure(df: pd.DataFrame, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        payload = trend_figure(df, "confirmed").to_json()
+        timings.append(time.perf_counter() - start)
+    return len(payload), float(np.median(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trend chart payload and build time with and without downsampling")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--width", type=int, default=1200, help="chart width in pixels used to derive the point budget")
+    parser.add_argument("--method", choices=["lttb", "minmax"], default="lttb")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    n_out = trend_point_budget(args.width)
+    print(f"Point budget for a {args.width}px chart: {n_out} ({args.method})")
+    print(f"{'points':>10} {'raw bytes':>12} {'raw ms':>9} {'ds bytes':>10} {'ds ms':>8} {'downsample ms':>14}")
+    for size in args.sizes:
+        df = synthetic_series(size)
+        raw_bytes, raw_time = measure(df, args.repeat)
+
+        start = time.perf_counter()
+        reduced = downsample_frame(df, "date", "confirmed", n_out, args.method)
+        downsample_time = time.perf_counter() - start
+        ds_bytes, ds_time = measure(reduced, args.repeat)
+
+        print(f"{size:>10,} {raw_bytes:>12,} {raw_time * 1000:>9.1f} {ds_bytes:>10,} {ds_time * 1000:>8.1f} {downsample_time * 1000:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
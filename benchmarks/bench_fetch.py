@@ -0,0 +1,125 @@
+import argparse
+import datetime
+import time
+import tracemalloc
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+from mysql.connector import FieldType
+
+from src.database import DatabaseConnection
+
+COLUMNS = [
+    ("country", FieldType.VAR_STRING),
+    ("date", FieldType.DATE),
+    ("confirmed", FieldType.NEWDECIMAL),
+    ("deaths", FieldType.NEWDECIMAL),
+    ("recovered", FieldType.NEWDECIMAL)
+]
+MYSQL_QUERY = "SELECT country, date, confirmed, deaths, recovered FROM covid_daily_country LIMIT %s"
+
+
+class ReplayCursor:
+    # Stands in for an unbuffered mysql.connector cursor over pre-built rows
+    def __init__(self, rows, dictionary=False):
+        self.rows = rows
+        self.dictionary = dictionary
+        # Like the real connector, the scale slot is always None
+        self.description = [(name, type_code, None, None, None, None, True) for name, type_code in COLUMNS]
+        self.position = 0
+
+    def execute(self, query, params=None):
+        self.position = 0
+
+    def _convert(self, rows):
+        if self.dictionary:
+            names = [column[0] for column in COLUMNS]
+            return [dict(zip(names, row)) for row in rows]
+        return rows
+
+    def fetchall(self):
+        return self.fetchmany(len(self.rows))
+
+    def fetchmany(self, size):
+        rows = self.rows[self.position:self.position + size]
+        self.position += len(rows)
+        return self._convert(rows)
+
+    def close(self):
+        pass
+
+
+class ReplayConnection:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def cursor(self, dictionary=False):
+        return ReplayCursor(self.rows, dictionary)
+
+    def commit(self):
+        pass
+
+
+def synthetic_rows(n_rows: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    countries = [f"Country {i}" for i in range(200)]
+    start = datetime.date(2020, 1, 22)
+    counts = rng.integers(0, 10_000_000, (n_rows, 3))
+    return [
+        (countries[i % len(countries)], start + datetime.timedelta(days=i // len(countries)), Decimal(int(c)), Decimal(int(d)), Decimal(int(r)))
+        for i, (c, d, r) in enumerate(counts)
+    ]
+
+
+def dict_path(db: DatabaseConnection, query: str, params: tuple) -> pd.DataFrame:
+    results = db.execute_query(query, params)
+    return pd.DataFrame(results) if results else pd.DataFrame()
+
+
+def columnar_path(db: DatabaseConnection, query: str, params: tuple) -> pd.DataFrame:
+    return db.fetch_frame(query, params, categories=("country",))
+
+
+def measure(fn, repeat: int):
+    # Timed runs and the memory run are kept apart; tracemalloc slows allocation-heavy code unevenly
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    result = fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return float(np.median(timings)), peak / (1024 * 1024), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Result decoding: dict rows + DataFrame vs. streamed columnar fetch")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--mysql", action="store_true", help="read covid_daily_country from the configured MySQL server instead of replayed rows")
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'path':>9} {'median ms':>10} {'peak MB':>8} {'frame MB':>9}")
+    for n_rows in args.rows:
+        if args.mysql:
+            db = DatabaseConnection()
+            if not db.connect():
+                raise SystemExit("Failed to connect to MySQL database")
+        else:
+            db = DatabaseConnection()
+            db.connection = ReplayConnection(synthetic_rows(n_rows))
+        try:
+            for name, path in (("dict", dict_path), ("columnar", columnar_path)):
+                seconds, peak_mb, frame = measure(lambda: path(db, MYSQL_QUERY, (n_rows,)), args.repeat)
+                frame_mb = frame.memory_usage(deep=True).sum() / (1024 * 1024)
+                print(f"{len(frame):>10,} {name:>9} {seconds * 1000:>10.1f} {peak_mb:>8.1f} {frame_mb:>9.1f}")
+        finally:
+            if args.mysql:
+                db.disconnect()
+
+
+if __name__ == "__main__":
+    main()
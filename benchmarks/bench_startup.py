@@ -0,0 +1,41 @@
+import argparse
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).parent.parent
+
+# What each run.py mode imports before doing any work; "eager" is what every
+# mode paid when run.py imported the sync module and the dashboard up front
+MODES = {
+    "help": [sys.executable, "run.py", "--help"],
+    "sync": [sys.executable, "-c", "import run; from src.sync_data import sync_covid_data"],
+    "serve": [sys.executable, "-c", "import run; from src.dashboard import app"],
+    "eager": [sys.executable, "-c", "from src.sync_data import sync_covid_data; from src.dashboard import app"]
+}
+
+
+def time_command(command, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Process start-up time per run.py mode, up to the point the mode starts working")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'mode':>8} {'median ms':>10}")
+    for mode, command in MODES.items():
+        print(f"{mode:>8} {time_command(command, args.repeat) * 1000:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import subprocess
+import time
+import tracemalloc
+
+import numpy as np
+
+
+def measure(fn, repeat: int = 1, rows: int = None):
+    timings = []
+    peak = 0
+    result = None
+    for _ in range(repeat):
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    stats = summarize(timings)
+    stats["peak_memory_mb"] = peak / (1024 * 1024)
+    if rows:
+        stats["rows"] = rows
+        stats["rows_per_sec"] = rows / stats["median_s"] if stats["median_s"] > 0 else None
+    return stats, result
+
+
+def summarize(timings):
+    values = np.asarray(timings)
+    return {
+        "runs": len(values),
+        "median_s": float(np.median(values)),
+        "p50_ms": float(np.percentile(values, 50) * 1000),
+        "p95_ms": float(np.percentile(values, 95) * 1000),
+        "p99_ms": float(np.percentile(values, 99) * 1000),
+        "max_ms": float(values.max() * 1000)
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
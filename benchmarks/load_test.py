@@ -0,0 +1,282 @@
+import argparse
+import json
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import requests
+
+from benchmarks.harness import git_revision, summarize
+from benchmarks.synthetic import synthetic_frames
+from src.database import METRICS, _create_tables, bump_data_version, make_connection, refresh_aggregates
+from src.sync_data import COVID_DATA_COLUMNS, UPSERT_COLUMNS, iter_covid_rows, reshape_covid_data
+
+ROOT = Path(__file__).parent.parent
+RESULTS_DIR = Path(__file__).parent / "results"
+MEASURES = ("total", "new", "avg7", "avg14", "growth")
+TICK_INTERVAL = 5.0
+STARTUP_TIMEOUT = 60.0
+CALLBACK_ERRORS = re.compile(r'^dataviz_callback_errors_total\{callback="(\w+)"\} (\S+)$', re.MULTILINE)
+
+# Relative frequency of viewer interactions; the interval tick is sent on its own clock
+INTERACTIONS = {
+    "update_trend": 6,
+    "update_global": 2,
+    "update_stats": 1
+}
+
+
+def dash_payload(outputs, inputs, state=()):
+    # Same body the Dash renderer posts to /_dash-update-component
+    outputs = [{"id": id_, "property": prop} for id_, prop in outputs]
+    return {
+        "output": outputs[0]["id"] + "." + outputs[0]["property"] if len(outputs) == 1
+        else ".." + "...".join(f"{o['id']}.{o['property']}" for o in outputs) + "..",
+        "outputs": outputs[0] if len(outputs) == 1 else outputs,
+        "inputs": [{"id": id_, "property": prop, "value": value} for id_, prop, value in inputs],
+        "state": [{"id": id_, "property": prop, "value": value} for id_, prop, value in state],
+        "changedPropIds": [f"{inputs[0][0]}.{inputs[0][1]}"]
+    }
+
+
+def poll_version_payload(n_intervals, version):
+    return dash_payload([("data-version", "data")], [("interval-component", "n_intervals", n_intervals)], [("data-version", "data", version)])
+
+
+def update_stats_payload(version):
+    return dash_payload(
+        [("confirmed-stat", "children"), ("deaths-stat", "children"), ("recovered-stat", "children"),
+         ("countries-stat", "children"), ("country-dropdown", "options")],
+        [("data-version", "data", version)]
+    )
+
+
+def update_trend_payload(country, chart_type, measure, version, width):
+    return dash_payload(
+        [("trend-chart", "figure")],
+        [("country-dropdown", "value", country), ("chart-type", "value", chart_type), ("trend-measure", "value", measure),
+         ("data-version", "data", version), ("trend-width", "data", width)]
+    )
+
+
+def update_global_payload(chart_type, version):
+    return dash_payload([("global-chart", "figure")], [("chart-type", "value", chart_type), ("data-version", "data", version)])
+
+
+def seed_database(path: str, regions: int, dates: int, seed: int):
+    frames = synthetic_frames(regions, dates, seed)
+    frame = reshape_covid_data(frames["confirmed"], frames["deaths"], frames["recovered"])
+    with make_connection("sqlite", path=path) as db:
+        _create_tables(db)
+        db.bulk_insert("covid_data", COVID_DATA_COLUMNS, iter_covid_rows(frame), update_columns=UPSERT_COLUMNS)
+        refresh_aggregates(db)
+        bump_data_version(db)
+    return len(frame)
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def is_dash_app(url: str) -> bool:
+    # Any server answers GET /; only a Dash app serves its layout as JSON here
+    try:
+        response = requests.get(url + "/_dash-layout", timeout=1)
+        return response.status_code == 200 and isinstance(response.json(), dict)
+    except (requests.RequestException, ValueError):
+        return False
+
+
+def start_app(path: str, port: int, workers: int):
+    command = [sys.executable, "run.py", "--db-backend", "sqlite", "--sqlite-path", path,
+               "serve", "--port", str(port), "--workers", str(workers), "--sync-interval", "0"]
+    process = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.perf_counter() + STARTUP_TIMEOUT
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"Dashboard exited with code {process.returncode}")
+        if is_dash_app(url):
+            return process, url
+        time.sleep(0.2)
+    process.terminate()
+    raise SystemExit("Dashboard did not start in time")
+
+
+def server_callback_errors(session: requests.Session, url: str) -> dict:
+    # Callbacks catch their own exceptions and still answer 200, so the server's counter is the other half of the error rate
+    try:
+        text = session.get(url + "/metrics", timeout=10).text
+    except requests.RequestException:
+        return {}
+    return {name: float(value) for name, value in CALLBACK_ERRORS.findall(text)}
+
+
+class Client(threading.Thread):
+    # One simulated viewer: opens the page, ticks every TICK_INTERVAL seconds
+    # like the interval component, and changes selections in between
+    def __init__(self, url, countries, version, deadline, think_time, timeout, seed, results, lock):
+        super().__init__(daemon=True)
+        self.url = url + "/_dash-update-component"
+        self.countries = countries
+        self.version = version
+        self.deadline = deadline
+        self.think_time = think_time
+        self.timeout = timeout
+        self.rng = random.Random(seed)
+        self.results = results
+        self.lock = lock
+        self.session = requests.Session()
+
+    def post(self, name, payload):
+        start = time.perf_counter()
+        try:
+            response = self.session.post(self.url, json=payload, timeout=self.timeout)
+            ok = response.status_code in (200, 204)
+            if response.status_code == 200 and name == "poll_version":
+                # An unchanged version comes back as an empty response
+                self.version = response.json()["response"].get("data-version", {}).get("data", self.version)
+        except (requests.RequestException, ValueError, KeyError):
+            ok = False
+        seconds = time.perf_counter() - start
+        with self.lock:
+            self.results[name].append((seconds, ok))
+
+    def interaction(self, name):
+        rng = self.rng
+        if name == "update_trend":
+            width = rng.choice((600, 900, 1200, 1800))
+            return update_trend_payload(rng.choice(self.countries), rng.choice(METRICS), rng.choice(MEASURES), self.version, width)
+        if name == "update_global":
+            return update_global_payload(rng.choice(METRICS), self.version)
+        return update_stats_payload(self.version)
+
+    def run(self):
+        for name in ("update_stats", "update_trend", "update_global"):
+            self.post(name, self.interaction(name))
+        # Stagger the ticks as real page loads would be
+        next_tick = time.perf_counter() + self.rng.uniform(0, TICK_INTERVAL)
+        n_intervals = 0
+        names, weights = zip(*INTERACTIONS.items())
+        while time.perf_counter() < self.deadline:
+            if time.perf_counter() >= next_tick:
+                n_intervals += 1
+                self.post("poll_version", poll_version_payload(n_intervals, self.version))
+                next_tick += TICK_INTERVAL
+                continue
+            name = self.rng.choices(names, weights)[0]
+            self.post(name, self.interaction(name))
+            if self.think_time > 0:
+                time.sleep(min(self.rng.expovariate(1 / self.think_time), max(0.0, next_tick - time.perf_counter())))
+
+
+def run_load(url, clients, duration, think_time, timeout, seed):
+    session = requests.Session()
+    response = session.post(url + "/_dash-update-component", json=poll_version_payload(0, None), timeout=timeout).json()
+    version = response["response"]["data-version"]["data"]
+    response = session.post(url + "/_dash-update-component", json=update_stats_payload(version), timeout=timeout).json()
+    countries = [None] + [option["value"] for option in response["response"]["country-dropdown"]["options"]]
+    errors_before = server_callback_errors(session, url)
+
+    results = defaultdict(list)
+    lock = threading.Lock()
+    start = time.perf_counter()
+    threads = [Client(url, countries, version, start + duration, think_time, timeout, seed + i, results, lock) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    errors_after = server_callback_errors(session, url)
+    report = {}
+    for name, samples in sorted(results.items()):
+        timings = [seconds for seconds, _ in samples]
+        failed = sum(1 for _, ok in samples if not ok)
+        callback_errors = errors_after.get(name, 0) - errors_before.get(name, 0)
+        stats = summarize(timings)
+        stats["requests_per_sec"] = len(samples) / elapsed
+        stats["http_errors"] = failed
+        stats["callback_errors"] = callback_errors
+        stats["error_rate"] = (failed + callback_errors) / len(samples)
+        report[name] = stats
+    total = sum(len(samples) for samples in results.values())
+    all_timings = [seconds for samples in results.values() for seconds, _ in samples]
+    report["all"] = summarize(all_timings)
+    report["all"]["requests_per_sec"] = total / elapsed
+    report["all"]["error_rate"] = sum(
+        stats["http_errors"] + stats["callback_errors"] for name, stats in report.items() if name != "all"
+    ) / total
+    return report
+
+
+def print_report(clients, report):
+    print(f"\n{clients} clients")
+    print(f"{'callback':>14} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>7}")
+    for name, stats in report.items():
+        print(f"{name:>14} {stats['requests_per_sec']:>8.1f} {stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} "
+              f"{stats['p99_ms']:>8.1f} {stats['max_ms']:>8.1f} {stats['error_rate']:>7.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulated concurrent viewers posting Dash callback requests to a local dashboard")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 5, 20], help="concurrent viewers, one run per value")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds per run")
+    parser.add_argument("--think-time", type=float, default=1.0, help="mean seconds between a viewer's interactions, 0 for back-to-back")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request timeout in seconds; timeouts count as errors")
+    parser.add_argument("--url", default=None, help="load an already running dashboard instead of starting one on a seeded SQLite file")
+    parser.add_argument("--port", type=int, default=None, help="port for the started dashboard (default: a free one)")
+    parser.add_argument("--workers", type=int, default=1, help="server processes for the started dashboard (needs gunicorn when above 1)")
+    parser.add_argument("--regions", type=int, default=280)
+    parser.add_argument("--dates", type=int, default=1140)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    revision = git_revision()
+    report = {
+        "revision": revision,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "params": {"duration": args.duration, "think_time": args.think_time, "workers": args.workers, "url": args.url,
+                   "regions": args.regions, "dates": args.dates},
+        "runs": {}
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        process = None
+        url = args.url.rstrip("/") if args.url else None
+        if url is not None and not is_dash_app(url):
+            raise SystemExit(f"No Dash app answering at {url}")
+        if url is None:
+            path = str(Path(tmp) / "load.sqlite")
+            print(f"Seeding {args.regions} regions x {args.dates} dates into {path}...")
+            seed_database(path, args.regions, args.dates, args.seed)
+            print(f"Starting dashboard on port {args.port}...")
+            process, url = start_app(path, args.port or free_port(), args.workers)
+        try:
+            for clients in args.clients:
+                print(f"Running {clients} clients for {args.duration:.0f}s...")
+                report["runs"][clients] = run_load(url.rstrip("/"), clients, args.duration, args.think_time, args.timeout, args.seed)
+                print_report(clients, report["runs"][clients])
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+    output = args.output or RESULTS_DIR / f"load-{revision or 'unknown'}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, default=str))
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
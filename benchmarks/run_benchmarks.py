@@ -0,0 +1,174 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from benchmarks.harness import git_revision, measure, summarize
+from benchmarks.synthetic import write_synthetic_csvs
+from src.data_fetch import CACHE_DIR_NAME, load_typed
+import src.database as database
+from src.database import METRICS, _create_tables, bump_data_version, make_connection, refresh_aggregates
+from src.sync_data import (
+    COVID_DATA_COLUMNS, SYNC_CHUNK_ROWS, iter_covid_chunks, iter_covid_chunks_parallel, iter_covid_rows,
+    regions_per_chunk, reshape_covid_data
+)
+
+RESULTS_DIR = Path(__file__).parent / "results"
+MEASURES = ("total", "new", "avg7", "avg14", "growth")
+
+
+def stage_parse(paths, repeat):
+    results = {}
+    results["read_csv"], frames = measure(lambda: {name: pd.read_csv(path) for name, path in paths.items()}, repeat)
+    shutil.rmtree(next(iter(paths.values())).parent / CACHE_DIR_NAME, ignore_errors=True)
+    results["typed_cache_cold"], _ = measure(lambda: {name: load_typed(path) for name, path in paths.items()}, 1)
+    results["typed_cache_warm"], frames = measure(lambda: {name: load_typed(path) for name, path in paths.items()}, repeat)
+    return results, frames
+
+
+def stage_reshape(frames, repeat):
+    stats, frame = measure(lambda: reshape_covid_data(frames["confirmed"], frames["deaths"], frames["recovered"]), repeat)
+    stats["rows_per_sec"] = len(frame) / stats["median_s"] if stats["median_s"] > 0 else None
+    stats["rows"] = len(frame)
+    return stats, frame
+
+
+def stage_reshape_chunked(frames, repeat, max_workers):
+    sources = (frames["confirmed"], frames["deaths"], frames["recovered"])
+    chunk_regions = regions_per_chunk(len(sources[0].columns) - 4, SYNC_CHUNK_ROWS)
+
+    def run(workers):
+        if workers > 1:
+            chunks = iter_covid_chunks_parallel(*sources, chunk_regions=chunk_regions, workers=workers)
+        else:
+            chunks = iter_covid_chunks(*sources, chunk_regions=chunk_regions)
+        return sum(len(frame) for _, frame in chunks)
+
+    results = {}
+    workers = 1
+    while workers <= max_workers:
+        stats, rows = measure(lambda: run(workers), repeat)
+        stats["rows_per_sec"] = rows / stats["median_s"] if stats["median_s"] > 0 else None
+        results[f"workers_{workers}"] = stats
+        workers *= 2
+    return results
+
+
+def refresh_sqlite(db):
+    refresh_aggregates(db)
+    bump_data_version(db)
+
+
+def stage_insert_sqlite(frame, chunk_size, path):
+    # The real SQLite backend and schema, so the dashboard stage reads what a sync would write
+    with make_connection("sqlite", path=path) as db:
+        _create_tables(db)
+        stats, _ = measure(lambda: db.bulk_insert("covid_data", COVID_DATA_COLUMNS, iter_covid_rows(frame), chunk_size=chunk_size), 1, rows=len(frame))
+        aggregate_stats, _ = measure(lambda: refresh_sqlite(db), 1)
+    return {"insert": stats, "refresh_aggregates": aggregate_stats}
+
+
+def stage_insert_mysql(frame, chunk_size, use_load_data):
+    from src.database import DatabaseConnection, init_database
+
+    init_database()
+    with DatabaseConnection(allow_local_infile=use_load_data) as db:
+        cursor = db.connection.cursor()
+        cursor.execute("DROP TABLE IF EXISTS covid_data_bench")
+        cursor.execute("CREATE TABLE covid_data_bench LIKE covid_data")
+        try:
+            stats, _ = measure(lambda: db.bulk_insert("covid_data_bench", COVID_DATA_COLUMNS, iter_covid_rows(frame), chunk_size=chunk_size, use_load_data=use_load_data), 1, rows=len(frame))
+        finally:
+            cursor.execute("DROP TABLE IF EXISTS covid_data_bench")
+            cursor.close()
+    return stats
+
+
+def stage_dashboard(path, requests, seed):
+    # Same settings DATAVIZ_DB_BACKEND / DATAVIZ_SQLITE_PATH would give; they are
+    # read when src.database is imported, which has already happened here
+    database.DB_BACKEND = "sqlite"
+    database.SQLITE_PATH = path
+    import src.dashboard as dashboard
+
+    countries = [None] + dashboard.get_countries()
+    rng = random.Random(seed)
+
+    callbacks = {
+        "update_stats": lambda: dashboard.update_stats(1),
+        "update_trend": lambda: dashboard.update_trend(rng.choice(countries), rng.choice(METRICS), rng.choice(MEASURES), 1, dashboard.DEFAULT_CHART_WIDTH),
+        "update_global": lambda: dashboard.update_global(rng.choice(METRICS), 1)
+    }
+    results = {}
+    for mode in ("cold", "warm"):
+        timings = {name: [] for name in callbacks}
+        for _ in range(requests):
+            if mode == "cold":
+                dashboard.data_cache.invalidate()
+                dashboard.figure_cache.invalidate()
+            for name, fn in callbacks.items():
+                start = time.perf_counter()
+                fn()
+                timings[name].append(time.perf_counter() - start)
+        results[mode] = {name: summarize(values) for name, values in timings.items()}
+    results["get_data"], _ = measure(lambda: dashboard.run_query(*dashboard.build_view_query("trend", "confirmed")), requests)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the sync and dashboard hot paths on synthetic CSSE data")
+    parser.add_argument("--regions", type=int, default=280)
+    parser.add_argument("--dates", type=int, default=1140)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--requests", type=int, default=50, help="callback invocations per mode")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="largest process count for the chunked reshape stage")
+    parser.add_argument("--mysql", action="store_true", help="also time bulk_insert against the configured MySQL server")
+    parser.add_argument("--load-data", action="store_true", help="use LOAD DATA LOCAL INFILE for the MySQL stage")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    revision = git_revision()
+    report = {
+        "revision": revision,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "params": {"regions": args.regions, "dates": args.dates, "repeat": args.repeat, "requests": args.requests, "chunk_size": args.chunk_size, "workers": args.workers},
+        "stages": {}
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"Generating {args.regions} regions x {args.dates} dates...")
+        paths = write_synthetic_csvs(Path(tmp), args.regions, args.dates, args.seed)
+
+        print("Timing CSV parsing...")
+        report["stages"]["parse"], frames = stage_parse(paths, args.repeat)
+        print("Timing reshape...")
+        report["stages"]["reshape"], frame = stage_reshape(frames, args.repeat)
+        print("Timing chunked reshape across worker processes...")
+        report["stages"]["reshape_chunked"] = stage_reshape_chunked(frames, args.repeat, args.workers)
+        print("Timing insertion (SQLite)...")
+        sqlite_path = str(Path(tmp) / "bench.sqlite")
+        report["stages"]["insert_sqlite"] = stage_insert_sqlite(frame, args.chunk_size, sqlite_path)
+        if args.mysql:
+            print("Timing insertion (MySQL)...")
+            report["stages"]["insert_mysql"] = stage_insert_mysql(frame, args.chunk_size, args.load_data)
+        print("Timing dashboard callbacks...")
+        report["stages"]["dashboard"] = stage_dashboard(sqlite_path, args.requests, args.seed)
+
+    output = args.output or RESULTS_DIR / f"{revision or 'unknown'}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, default=str))
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
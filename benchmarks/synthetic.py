@@ -0,0 +1,48 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+SERIES = ("confirmed", "deaths", "recovered")
+DEATH_RATE = 0.02
+RECOVERY_RATE = 0.8
+
+
+def synthetic_frames(n_regions: int, n_dates: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    # Roughly CSSE-shaped: most regions are whole countries, the rest are provinces
+    n_countries = max(1, int(n_regions * 0.7))
+    regions = range(n_regions)
+    country = np.array([f"Country {i % n_countries:03d}" for i in regions], dtype=object)
+    province = np.array([f"Province {i:03d}" if i >= n_countries else np.nan for i in regions], dtype=object)
+
+    locations = pd.DataFrame({
+        "Province/State": province,
+        "Country/Region": country,
+        "Lat": rng.uniform(-60, 70, n_regions).round(4),
+        "Long": rng.uniform(-180, 180, n_regions).round(4)
+    })
+    dates = pd.date_range("2020-01-22", periods=n_dates, freq="D")
+    headers = [f"{d.month}/{d.day}/{d.strftime('%y')}" for d in dates]
+
+    daily = rng.poisson(lam=rng.uniform(0.5, 500, (n_regions, 1)), size=(n_regions, n_dates))
+    confirmed = np.cumsum(daily, axis=1)
+    counts = {
+        "confirmed": confirmed,
+        "deaths": (confirmed * DEATH_RATE).astype("int64"),
+        "recovered": (confirmed * RECOVERY_RATE).astype("int64")
+    }
+    return {
+        name: pd.concat([locations, pd.DataFrame(counts[name], columns=headers)], axis=1)
+        for name in SERIES
+    }
+
+
+def write_synthetic_csvs(directory: Path, n_regions: int, n_dates: int, seed: int = 0):
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = {}
+    for name, frame in synthetic_frames(n_regions, n_dates, seed).items():
+        paths[name] = directory / f"{name}.csv"
+        frame.to_csv(paths[name], index=False)
+    return paths
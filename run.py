@@ -1,35 +1,134 @@
+import argparse
+import os
 import sys
-from src.sync_data import sync_covid_data
-from src.dashboard import app
-
-def main():
-    print("DataViz - COVID-19 Dashboard")
-    print("=" * 50)
-    
-    print("\n[1] Sync COVID-19 data to MySQL")
-    print("[2] Run Dashboard")
-    print("[3] Sync data and run dashboard")
-    print("[4] Exit")
-    
-    choice = input("\nSelect option (1-4): ").strip()
-    
-    if choice == "1":
-        sync_covid_data()
-    elif choice == "2":
-        print("\nStarting dashboard on http://127.0.0.1:8050/")
-        print("Press Ctrl+C to stop the server\n")
-        app.run(debug=False)
-    elif choice == "3":
-        sync_covid_data()
-        print("\nStarting dashboard on http://127.0.0.1:8050/")
-        print("Press Ctrl+C to stop the server\n")
-        app.run(debug=False)
-    elif choice == "4":
-        print("Exiting...")
-        sys.exit(0)
-    else:
-        print("Invalid option")
-        main()
+import time
+
+START = time.perf_counter()
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8050
+
+# Command-line database settings are handed to src.database through the
+# environment, so they must be in place before any src module is imported
+DB_OPTIONS = {
+    "db_backend": "DATAVIZ_DB_BACKEND",
+    "sqlite_path": "DATAVIZ_SQLITE_PATH",
+    "db_host": "DATAVIZ_DB_HOST",
+    "db_user": "DATAVIZ_DB_USER",
+    "db_name": "DATAVIZ_DB_NAME"
+}
+
+def report_startup(mode: str):
+    print(f"[{mode}] ready in {time.perf_counter() - START:.2f}s")
+
+def run_sync(args):
+    from src.sync_data import sync_covid_data
+    report_startup("sync")
+    stats = sync_covid_data(
+        chunk_size=args.chunk_size,
+        use_load_data=args.load_data,
+        full_refresh=args.full_refresh,
+        workers=args.sync_workers,
+        staging=args.staging
+    )
+    return stats is not None
+
+def start_scheduler(args, run_at_start: bool = False):
+    # With --debug the reloader's parent process only watches files; the server runs in its child
+    if args.debug and os.environ.get("WERKZEUG_RUN_MAIN") != "true":
+        return None
+    from src.scheduler import SYNC_INTERVAL, SyncScheduler
+    interval = SYNC_INTERVAL if args.sync_interval is None else args.sync_interval
+    if interval <= 0 and not run_at_start:
+        return None
+    options = {}
+    if run_at_start:
+        options = {"chunk_size": args.chunk_size, "use_load_data": args.load_data, "workers": args.sync_workers}
+    if interval > 0:
+        print(f"Background sync every {interval:.0f}s")
+    return SyncScheduler(interval, run_at_start, **options).start()
+
+def run_serve(args, run_sync_at_start: bool = False):
+    from src.dashboard import app
+    report_startup("serve")
+    start_scheduler(args, run_sync_at_start)
+    print(f"\nStarting dashboard on http://{args.host}:{args.port}/")
+    print("Press Ctrl+C to stop the server\n")
+
+    if args.workers > 1:
+        try:
+            from gunicorn.app.base import BaseApplication
+        except ImportError:
+            print("gunicorn is not installed; serving from a single process")
+        else:
+            class DashApplication(BaseApplication):
+                def load_config(self):
+                    self.cfg.set("bind", f"{args.host}:{args.port}")
+                    self.cfg.set("workers", args.workers)
+
+                def load(self):
+                    return app.server
+
+            DashApplication().run()
+            return True
+
+    app.run(host=args.host, port=args.port, debug=args.debug)
+    return True
+
+def run_sync_and_serve(args):
+    # The sync runs in the background against staging tables, so the dashboard
+    # comes up straight away and serves the previous data until the swap
+    return run_serve(args, run_sync_at_start=True)
+
+def add_sync_options(parser):
+    parser.add_argument("--sync-workers", type=int, default=1, help="processes for the reshape and connections for the load")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="rows per INSERT statement")
+    parser.add_argument("--load-data", action="store_true", help="load with LOAD DATA LOCAL INFILE")
+
+def add_serve_options(parser):
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=1, help="server processes (needs gunicorn when above 1)")
+    parser.add_argument("--debug", action="store_true")
+    parser.add_argument("--sync-interval", type=float, default=None, help="seconds between background syncs, 0 for none (default: $DATAVIZ_SYNC_INTERVAL or 0)")
+
+def build_parser():
+    # No password option: argv is visible to other users through ps and ends up in shell history
+    parser = argparse.ArgumentParser(
+        description="DataViz - COVID-19 Dashboard",
+        epilog="The MySQL password is read from $DATAVIZ_DB_PASSWORD (default: root)."
+    )
+    parser.add_argument("--db-backend", choices=["mysql", "sqlite"], help="storage backend (default: $DATAVIZ_DB_BACKEND or mysql)")
+    parser.add_argument("--sqlite-path", help="database file for the sqlite backend (default: $DATAVIZ_SQLITE_PATH or data/covid19.sqlite)")
+    parser.add_argument("--db-host", help="MySQL host (default: $DATAVIZ_DB_HOST or localhost)")
+    parser.add_argument("--db-user", help="MySQL user (default: $DATAVIZ_DB_USER or root)")
+    parser.add_argument("--db-name", help="MySQL database (default: $DATAVIZ_DB_NAME or covid19)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    sync = commands.add_parser("sync", help="sync COVID-19 data to the database")
+    add_sync_options(sync)
+    # sync-and-serve always rebuilds through staging tables, which is already a full refresh
+    sync.add_argument("--full-refresh", action="store_true", help="reload every date instead of only new ones")
+    sync.add_argument("--staging", action="store_true", help="rebuild into staging tables and swap them in at the end")
+    sync.set_defaults(handler=run_sync)
+
+    serve = commands.add_parser("serve", help="run the dashboard")
+    add_serve_options(serve)
+    serve.set_defaults(handler=run_serve)
+
+    both = commands.add_parser("sync-and-serve", help="run the dashboard and sync data in the background")
+    add_sync_options(both)
+    add_serve_options(both)
+    both.set_defaults(handler=run_sync_and_serve)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    for option, variable in DB_OPTIONS.items():
+        value = getattr(args, option)
+        if value is not None:
+            os.environ[variable] = value
+    return 0 if args.handler(args) else 1
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,289 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Optional
+
+import pandas as pd
+
+CACHE_BACKEND = os.environ.get("DATAVIZ_CACHE_BACKEND", "memory")
+CACHE_DIR = os.environ.get("DATAVIZ_CACHE_DIR", str(Path(__file__).parent.parent / "data" / "dashboard-cache"))
+CACHE_MAX_BYTES = int(os.environ.get("DATAVIZ_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+CACHE_MAX_ENTRIES = 512
+REDIS_URL = os.environ.get("DATAVIZ_REDIS_URL", "redis://localhost:6379/0")
+
+
+class CacheBackend:
+    shared = False
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        raise NotImplementedError
+
+    def set(self, key: Hashable, value: Any):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class MemoryBackend(CacheBackend):
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DiskBackend(CacheBackend):
+    # One pickle per key in a local directory; every worker process on the
+    # host reads and writes the same files, and writes are atomic renames
+    shared = True
+
+    def __init__(self, directory: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._ensure_private_directory()
+
+    def _ensure_private_directory(self):
+        # Entries are unpickled, so anyone who can write here can run code in the dashboard
+        self.directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+        stat = self.directory.stat()
+        if hasattr(os, "getuid") and stat.st_uid != os.getuid():
+            raise PermissionError(f"Cache directory {self.directory} is not owned by the current user")
+        if stat.st_mode & 0o077:
+            os.chmod(self.directory, 0o700)
+
+    def _path(self, key) -> Path:
+        digest = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+        return self.directory / f"{digest}.pkl"
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+            # Access time drives eviction; mtime is used because atime is often disabled
+            os.utime(path)
+            return value
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def set(self, key, value):
+        path = self._path(key)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return
+        self._evict()
+
+    def clear(self):
+        for path in self.directory.glob("*.pkl"):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def _evict(self):
+        entries = []
+        total = 0
+        for path in self.directory.glob("*.pkl"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+                total -= size
+            except OSError:
+                pass
+
+
+class RedisBackend(CacheBackend):
+    # Size bounds come from the server's maxmemory / eviction policy
+    shared = True
+
+    def __init__(self, url: str = REDIS_URL, prefix: str = "dataviz:", ttl: Optional[int] = None):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def _key(self, key) -> str:
+        return self.prefix + hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        data = self.client.get(self._key(key))
+        return pickle.loads(data) if data is not None else None
+
+    def set(self, key, value):
+        self.client.set(self._key(key), pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), ex=self.ttl)
+
+    def clear(self):
+        for name in self.client.scan_iter(self.prefix + "*"):
+            self.client.delete(name)
+
+
+def make_backend(name: str = CACHE_BACKEND, max_entries: int = CACHE_MAX_ENTRIES) -> CacheBackend:
+    if name == "memory":
+        return MemoryBackend(max_entries)
+    if name == "disk":
+        return DiskBackend()
+    if name == "redis":
+        return RedisBackend()
+    raise ValueError(f"Unknown cache backend: {name}")
+
+
+def _is_cacheable(value) -> bool:
+    # None and empty frames usually mean the load failed; retry on the next call
+    if value is None:
+        return False
+    if isinstance(value, pd.DataFrame):
+        return not value.empty
+    return True
+
+
+class DataCache:
+    def __init__(self, probe: Callable[[], Optional[tuple]], ttl: float = 300.0, probe_interval: float = 5.0, backend: Optional[CacheBackend] = None):
+        self.probe = probe
+        self.ttl = ttl
+        self.probe_interval = probe_interval
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.hits = 0
+        self.misses = 0
+        self._signature = None
+        self._last_probe = None
+        # Guards the signature and counters only. Backends synchronize
+        # themselves, and loads, probes and backend I/O run outside it so a
+        # slow miss or a disk read never blocks callers of other keys
+        self._lock = threading.Lock()
+        # Per-key single flight: concurrent misses on one key share a single load
+        self._key_locks: Dict[Hashable, list] = {}
+        self._probe_lock = threading.Lock()
+
+    def get(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        self._check_for_changes()
+
+        # The data version is part of the key so workers sharing a backend
+        # never serve each other entries from an older version
+        full_key = (key, self._signature)
+        value = self._lookup(full_key)
+        if value is not None:
+            return value
+
+        key_lock = self._acquire_key_lock(full_key)
+        try:
+            with key_lock:
+                # Another caller may have loaded it while this one waited
+                value = self._lookup(full_key, count_miss=True)
+                if value is not None:
+                    return value
+                value = loader()
+                if _is_cacheable(value):
+                    self.backend.set(full_key, (time.time(), value))
+                return value
+        finally:
+            self._release_key_lock(full_key)
+
+    def _lookup(self, full_key, count_miss: bool = False):
+        entry = self.backend.get(full_key)
+        with self._lock:
+            if entry is not None and time.time() - entry[0] < self.ttl:
+                self.hits += 1
+                return entry[1]
+            if count_miss:
+                self.misses += 1
+            return None
+
+    def _acquire_key_lock(self, full_key) -> threading.Lock:
+        with self._lock:
+            entry = self._key_locks.setdefault(full_key, [threading.Lock(), 0])
+            entry[1] += 1
+            return entry[0]
+
+    def _release_key_lock(self, full_key):
+        with self._lock:
+            entry = self._key_locks[full_key]
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._key_locks[full_key]
+
+    def current_signature(self):
+        self._check_for_changes()
+        return self._signature
+
+    def invalidate(self):
+        self.backend.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "backend": type(self.backend).__name__,
+                "signature": self._signature
+            }
+
+    def _check_for_changes(self):
+        with self._lock:
+            if self._last_probe is not None and time.monotonic() - self._last_probe < self.probe_interval:
+                return
+        # One caller probes at a time; the rest keep the current signature
+        # rather than queueing on the same round trip, unless there is none yet
+        if not self._probe_lock.acquire(blocking=self._signature is None):
+            return
+        try:
+            with self._lock:
+                now = time.monotonic()
+                if self._last_probe is not None and now - self._last_probe < self.probe_interval and self._signature is not None:
+                    return
+                self._last_probe = now
+
+            signature = self.probe()
+            if signature is None:
+                return
+            with self._lock:
+                if signature == self._signature:
+                    return
+                # Process-local entries for the old version are dead weight; shared
+                # backends are left to their own eviction since other workers use them
+                stale = self._signature is not None and not self.backend.shared
+                self._signature = signature
+            if stale:
+                self.backend.clear()
+        finally:
+            self._probe_lock.release()
@@ -1,12 +1,29 @@
+import logging
+import os
+import threading
+import time
 import dash
-from dash import dcc, html, Input, Output, callback, State
+from dash import dcc, html, Input, Output, callback, clientside_callback, State, no_update
 import dash_bootstrap_components as dbc
-import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
-from src.database import DatabaseConnection
+from flask import Response, g, jsonify, request
+from src.database import (
+    METRICS,
+    make_connection,
+    get_data_version,
+    pool_gauges,
+    build_countries_query,
+    build_latest_totals_query,
+    build_top_countries_query,
+    build_trend_query
+)
+from src.cache import DataCache, make_backend
+from src.downsample import downsample_frame
+from src.metrics import metrics
 
 app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
+logger = logging.getLogger(__name__)
 
 COLORS = {
     'confirmed': '#FF6B6B',
@@ -19,28 +36,217 @@ COLORS = {
     'text_secondary': '#B0B8C1'
 }
 
-def get_data():
+DATA_CACHE_TTL = 300
+DATA_PROBE_INTERVAL = 5
+VERSION_POLL_INTERVAL_MS = 5000
+TOP_COUNTRIES = 15
+FIGURE_CACHE_MAX_ENTRIES = 1024
+WARM_UP_FIGURES = True
+DOWNSAMPLE_TRENDS = True
+DOWNSAMPLE_METHOD = "lttb"
+DEFAULT_CHART_WIDTH = 1200
+POINTS_PER_PIXEL = 1.0
+# Point budgets charts are snapped to, so every screen size maps onto a few
+# cached figures that the warm-up can build ahead of time
+TREND_POINT_TIERS = (400, 800, 1600)
+TREND_MEASURES = {
+    "total": "Cumulative",
+    "new": "Daily new",
+    "avg7": "7-day average",
+    "avg14": "14-day average",
+    "growth": "Weekly growth rate"
+}
+REQUEST_TIMING_LOG = os.environ.get("DATAVIZ_TIMING_LOG", "") == "1"
+
+if REQUEST_TIMING_LOG:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+
+def probe_data_version():
+    try:
+        with make_connection() as db:
+            return get_data_version(db)
+    except Exception:
+        metrics.inc("errors", source="probe_data_version")
+        logger.exception("Error probing data version")
+        return None
+
+data_cache = DataCache(probe_data_version, ttl=DATA_CACHE_TTL, probe_interval=DATA_PROBE_INTERVAL, backend=make_backend())
+# Figures are keyed by (chart, metric, country) and the data version, like the frames they are built from
+figure_cache = DataCache(data_cache.current_signature, ttl=DATA_CACHE_TTL, probe_interval=0, backend=make_backend(max_entries=FIGURE_CACHE_MAX_ENTRIES))
+_warm_up_lock = threading.Lock()
+# Kept per process rather than per tab, so new sessions do not re-trigger a warm-up
+_warmed_version = None
+
+def cache_gauges(field: str):
+    return lambda: [({"cache": name}, cache.stats()[field]) for name, cache in (("data", data_cache), ("figure", figure_cache))]
+
+metrics.register_gauges("cache_hits", cache_gauges("hits"))
+metrics.register_gauges("cache_misses", cache_gauges("misses"))
+for field in ("size", "in_use", "checkouts", "timeouts", "wait_seconds_total", "wait_seconds_max"):
+    metrics.register_gauges(f"db_pool_{field}", pool_gauges(field))
+
+def build_view_query(view: str, metric: str = None, country: str = None):
+    if view == "totals":
+        return build_latest_totals_query()
+    if view == "countries":
+        return build_countries_query()
+    if view == "trend":
+        return build_trend_query(metric, country)
+    if view == "top":
+        return build_top_countries_query(metric, TOP_COUNTRIES)
+    raise ValueError(f"Unknown view: {view}")
+
+def get_data(view: str, metric: str = None, country: str = None):
+    query, params = build_view_query(view, metric, country)
+    return data_cache.get((view, country, metric), lambda: run_query(query, params))
+
+def run_query(query: str, params: tuple = ()):
     try:
-        db = DatabaseConnection()
-        if not db.connect():
-            return pd.DataFrame()
-        cursor = db.connection.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM covid_data ORDER BY date DESC LIMIT 100000")
-        results = cursor.fetchall()
-        cursor.close()
-        db.disconnect()
-        return pd.DataFrame(results) if results else pd.DataFrame()
-    except Exception as e:
-        print(f"Error loading data: {e}")
+        # Decoding happens while the rows stream in, so db_query now covers building the frame too
+        with metrics.timer("db_query"):
+            with make_connection() as db:
+                df = db.fetch_frame(query, params, categories=("country",))
+        if df is None:
+            df = pd.DataFrame()
+        metrics.inc("rows_read", len(df))
+        return df
+    except Exception:
+        metrics.inc("errors", source="run_query")
+        logger.exception("Error loading data")
         return pd.DataFrame()
 
 def get_countries():
     try:
-        df = get_data()
-        return sorted(df['country'].unique().tolist()) if not df.empty else []
+        df = get_data("countries")
+        return df['country'].tolist() if not df.empty else []
     except:
         return []
 
+def trend_point_budget(chart_width=None):
+    if not DOWNSAMPLE_TRENDS:
+        return None
+    points = int((chart_width or DEFAULT_CHART_WIDTH) * POINTS_PER_PIXEL)
+    return next((tier for tier in TREND_POINT_TIERS if points <= tier), TREND_POINT_TIERS[-1])
+
+def trend_column(chart_type: str, measure: str = "total") -> str:
+    # Derived series are precomputed columns next to the cumulative one
+    return chart_type if measure in (None, "total") else f"{chart_type}_{measure}"
+
+@metrics.timed("figure_build", chart="trend")
+def build_trend_figure(chart_type: str, country: str = None, n_points: int = None, measure: str = "total"):
+    column = trend_column(chart_type, measure)
+    df = get_data("trend", column, country)
+    if df.empty:
+        return None
+    # Rolling windows and growth rates are undefined for the first days of the series
+    df = df.dropna(subset=[column])
+    if n_points:
+        df = downsample_frame(df, "date", column, n_points, DOWNSAMPLE_METHOD)
+    return trend_figure(df, chart_type, country, measure).to_plotly_json()
+
+def trend_figure(df: pd.DataFrame, chart_type: str, country: str = None, measure: str = "total"):
+    # plotly.express is the slowest import here and only needed once a figure
+    # is built, so it stays out of the serve start-up path
+    import plotly.express as px
+    column = trend_column(chart_type, measure)
+    label = "" if measure in (None, "total") else f" ({TREND_MEASURES[measure].upper()})"
+    fig = px.line(
+        df,
+        x="date",
+        y=column,
+        title=f"<b>{chart_type.upper()} CASES TREND{label}</b>" + (f"<br><sub>{country}</sub>" if country else "<br><sub>Global</sub>"),
+        labels={"date": "Date", column: "Rate" if measure == "growth" else "Count"}
+    )
+    
+    color_map = {'confirmed': COLORS['confirmed'], 'deaths': COLORS['deaths'], 'recovered': COLORS['recovered']}
+    
+    fig.update_traces(line=dict(color=color_map[chart_type], width=3))
+    fig.update_layout(
+        hovermode="x unified",
+        template="plotly_dark",
+        paper_bgcolor=COLORS['card_bg'],
+        plot_bgcolor=COLORS['background'],
+        font=dict(color=COLORS['text'], size=12),
+        title_font_size=16,
+        margin=dict(l=50, r=50, t=60, b=50),
+        xaxis=dict(gridcolor='#2A3543'),
+        yaxis=dict(gridcolor='#2A3543', tickformat=".1%" if measure == "growth" else None)
+    )
+    return fig
+
+@metrics.timed("figure_build", chart="global")
+def build_global_figure(chart_type: str):
+    df = get_data("top", chart_type)
+    if df.empty:
+        return None
+    
+    df = df.iloc[::-1]
+    
+    import plotly.express as px
+    color_map = {'confirmed': COLORS['confirmed'], 'deaths': COLORS['deaths'], 'recovered': COLORS['recovered']}
+    
+    fig = px.bar(
+        df,
+        x=chart_type,
+        y="country",
+        title=f"<b>TOP {TOP_COUNTRIES} COUNTRIES BY {chart_type.upper()}</b>",
+        labels={chart_type: "Count", "country": "Country"},
+        orientation="h"
+    )
+    
+    fig.update_traces(marker=dict(color=color_map[chart_type]))
+    fig.update_layout(
+        template="plotly_dark",
+        paper_bgcolor=COLORS['card_bg'],
+        plot_bgcolor=COLORS['background'],
+        font=dict(color=COLORS['text'], size=12),
+        title_font_size=16,
+        margin=dict(l=150, r=50, t=60, b=50),
+        xaxis=dict(gridcolor='#2A3543'),
+        yaxis=dict(gridcolor='#2A3543'),
+        hovermode='closest'
+    )
+    return fig.to_plotly_json()
+
+def get_trend_figure(chart_type: str, country: str = None, n_points: int = None, measure: str = "total"):
+    if n_points is not None:
+        # A series that already fits the budget is drawn whole, whatever the width
+        df = get_data("trend", trend_column(chart_type, measure), country)
+        if len(df) <= n_points:
+            n_points = None
+    return figure_cache.get(("figure", "trend", chart_type, measure, country, n_points), lambda: build_trend_figure(chart_type, country, n_points, measure))
+
+def get_global_figure(chart_type: str):
+    return figure_cache.get(("figure", "global", chart_type, None), lambda: build_global_figure(chart_type))
+
+def warm_figure_cache(version=None):
+    # Pre-build the views most sessions open first: the global trend and
+    # top-N chart per metric, plus the trend of every top-N country
+    global _warmed_version
+    try:
+        budgets = TREND_POINT_TIERS if DOWNSAMPLE_TRENDS else (None,)
+        for metric in METRICS:
+            get_global_figure(metric)
+            top = get_data("top", metric)
+            for country in [None] + (top['country'].tolist() if not top.empty else []):
+                for n_points in budgets:
+                    get_trend_figure(metric, country, n_points)
+        _warmed_version = version
+        print(f"Figure cache warmed: {figure_cache.stats()}")
+    except Exception:
+        metrics.inc("errors", source="warm_figure_cache")
+        logger.exception("Error warming figure cache")
+    finally:
+        _warm_up_lock.release()
+
+def start_figure_warm_up(version=None) -> bool:
+    if version is not None and version == _warmed_version:
+        return False
+    if not _warm_up_lock.acquire(blocking=False):
+        return False
+    threading.Thread(target=warm_figure_cache, args=(version,), name="figure-warm-up", daemon=True).start()
+    return True
+
 app.layout = dbc.Container([
     html.Div(id="page-content", style={
         "background": COLORS['background'],
@@ -126,6 +332,15 @@ app.layout = dbc.Container([
                             ],
                             value="confirmed",
                             style={"color": "#000", "borderRadius": "8px"}
+                        ),
+                        html.Br(),
+                        html.Label("Trend:", style={"marginBottom": "0.5rem", "fontWeight": "600"}),
+                        dcc.Dropdown(
+                            id="trend-measure",
+                            options=[{"label": label, "value": value} for value, label in TREND_MEASURES.items()],
+                            value="total",
+                            clearable=False,
+                            style={"color": "#000", "borderRadius": "8px"}
                         )
                     ], style={"background": COLORS['card_bg']})
                 ], style={"background": COLORS['card_bg'], "border": "none", "borderRadius": "12px"})
@@ -150,30 +365,69 @@ app.layout = dbc.Container([
             ], width=12)
         ]),
         
-        dcc.Interval(id="interval-component", interval=5000, n_intervals=0)
+        dcc.Store(id="data-version"),
+        dcc.Store(id="trend-width"),
+        dcc.Interval(id="interval-component", interval=VERSION_POLL_INTERVAL_MS, n_intervals=0)
     ])
 ], fluid=True, style={"padding": "0", "maxWidth": "100%"})
 
+@app.server.route("/api/version")
+def data_version_endpoint():
+    return jsonify({"version": data_cache.current_signature()})
+
+@app.server.route("/metrics")
+def metrics_endpoint():
+    return Response(metrics.render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+@app.server.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.server.after_request
+def log_request_timing(response):
+    if REQUEST_TIMING_LOG and "request_start" in g:
+        elapsed_ms = (time.perf_counter() - g.request_start) * 1000
+        payload = request.get_json(silent=True) if request.is_json else None
+        target = payload.get("output") if isinstance(payload, dict) else None
+        logger.info("%s %s %s %.1fms%s", request.method, request.path, response.status_code, elapsed_ms, f" output={target}" if target else "")
+    return response
+
+@callback(
+    Output("data-version", "data"),
+    Input("interval-component", "n_intervals"),
+    State("data-version", "data")
+)
+@metrics.timed("callback", callback="poll_version")
+def poll_version(_, current_version):
+    # The only callback on the timer: a cached version lookup per tick, and the
+    # expensive callbacks below fire only when the version actually moves
+    version = data_cache.current_signature()
+    if version is None or version == current_version:
+        return no_update
+    if WARM_UP_FIGURES:
+        start_figure_warm_up(version)
+    return version
+
 @callback(
     [Output("confirmed-stat", "children"),
      Output("deaths-stat", "children"),
      Output("recovered-stat", "children"),
      Output("countries-stat", "children"),
      Output("country-dropdown", "options")],
-    Input("interval-component", "n_intervals")
+    Input("data-version", "data")
 )
+@metrics.timed("callback", callback="update_stats")
 def update_stats(_):
     try:
-        df = get_data()
+        df = get_data("totals")
         if df.empty:
             return "0", "0", "0", "0", []
         
-        latest_date = df['date'].max()
-        latest_data = df[df['date'] == latest_date]
+        latest_data = df.iloc[0]
         
-        total_confirmed = int(latest_data['confirmed'].sum())
-        total_deaths = int(latest_data['deaths'].sum())
-        total_recovered = int(latest_data['recovered'].sum())
+        total_confirmed = int(latest_data['confirmed'])
+        total_deaths = int(latest_data['deaths'])
+        total_recovered = int(latest_data['recovered'])
         countries = get_countries()
         
         return (
@@ -183,64 +437,44 @@ def update_stats(_):
             f"{len(countries)}",
             [{"label": c, "value": c} for c in countries]
         )
-    except Exception as e:
-        print(f"Error updating stats: {e}")
+    except Exception:
+        metrics.inc("callback_errors", callback="update_stats")
+        logger.exception("Error in update_stats")
         return "0", "0", "0", "0", []
 
+clientside_callback(
+    """
+    function(_) {
+        var graph = document.getElementById("trend-chart");
+        return graph && graph.offsetWidth ? graph.offsetWidth : window.innerWidth;
+    }
+    """,
+    Output("trend-width", "data"),
+    Input("page-content", "id")
+)
+
 @callback(
     Output("trend-chart", "figure"),
     [Input("country-dropdown", "value"),
      Input("chart-type", "value"),
-     Input("interval-component", "n_intervals")]
+     Input("trend-measure", "value"),
+     Input("data-version", "data"),
+     Input("trend-width", "data")]
 )
-def update_trend(country, chart_type, _):
+@metrics.timed("callback", callback="update_trend")
+def update_trend(country, chart_type, measure, _, chart_width):
     try:
-        df = get_data()
-        
-        if df.empty:
-            fig = go.Figure()
-            fig.add_annotation(text="No data available")
-            return fig
+        figure = get_trend_figure(chart_type, country, trend_point_budget(chart_width), measure)
         
-        if country:
-            df = df[df['country'] == country]
-        
-        df = df.groupby('date').agg({
-            'confirmed': 'sum',
-            'deaths': 'sum',
-            'recovered': 'sum'
-        }).reset_index().sort_values('date')
-        
-        if df.empty:
+        if figure is None:
             fig = go.Figure()
-            fig.add_annotation(text="No data for selected country")
+            fig.add_annotation(text="No data for selected country" if country else "No data available")
             return fig
         
-        fig = px.line(
-            df,
-            x="date",
-            y=chart_type,
-            title=f"<b>{chart_type.upper()} CASES TREND</b>" + (f"<br><sub>{country}</sub>" if country else "<br><sub>Global</sub>"),
-            labels={"date": "Date", chart_type: "Count"}
-        )
-        
-        color_map = {'confirmed': COLORS['confirmed'], 'deaths': COLORS['deaths'], 'recovered': COLORS['recovered']}
-        
-        fig.update_traces(line=dict(color=color_map[chart_type], width=3))
-        fig.update_layout(
-            hovermode="x unified",
-            template="plotly_dark",
-            paper_bgcolor=COLORS['card_bg'],
-            plot_bgcolor=COLORS['background'],
-            font=dict(color=COLORS['text'], size=12),
-            title_font_size=16,
-            margin=dict(l=50, r=50, t=60, b=50),
-            xaxis=dict(gridcolor='#2A3543'),
-            yaxis=dict(gridcolor='#2A3543')
-        )
-        return fig
-    except Exception as e:
-        print(f"Error updating trend: {e}")
+        return figure
+    except Exception:
+        metrics.inc("callback_errors", callback="update_trend")
+        logger.exception("Error in update_trend")
         fig = go.Figure()
         fig.add_annotation(text=f"Error loading chart")
         return fig
@@ -248,51 +482,22 @@ def update_trend(country, chart_type, _):
 @callback(
     Output("global-chart", "figure"),
     [Input("chart-type", "value"),
-     Input("interval-component", "n_intervals")]
+     Input("data-version", "data")]
 )
+@metrics.timed("callback", callback="update_global")
 def update_global(chart_type, _):
     try:
-        df = get_data()
+        figure = get_global_figure(chart_type)
         
-        if df.empty:
+        if figure is None:
             fig = go.Figure()
             fig.add_annotation(text="No data available")
             return fig
         
-        latest_date = df['date'].max()
-        df = df[df['date'] == latest_date].groupby('country').agg({
-            'confirmed': 'sum',
-            'deaths': 'sum',
-            'recovered': 'sum'
-        }).reset_index().sort_values(chart_type, ascending=True).tail(15)
-        
-        color_map = {'confirmed': COLORS['confirmed'], 'deaths': COLORS['deaths'], 'recovered': COLORS['recovered']}
-        
-        fig = px.bar(
-            df,
-            x=chart_type,
-            y="country",
-            title=f"<b>TOP 15 COUNTRIES BY {chart_type.upper()}</b>",
-            labels={chart_type: "Count", "country": "Country"},
-            orientation="h"
-        )
-        
-        fig.update_traces(marker=dict(color=color_map[chart_type]))
-        fig.update_layout(
-            template="plotly_dark",
-            paper_bgcolor=COLORS['card_bg'],
-            plot_bgcolor=COLORS['background'],
-            font=dict(color=COLORS['text'], size=12),
-            title_font_size=16,
-            margin=dict(l=150, r=50, t=60, b=50),
-            xaxis=dict(gridcolor='#2A3543'),
-            yaxis=dict(gridcolor='#2A3543'),
-            hovermode='closest'
-        )
-        
-        return fig
-    except Exception as e:
-        print(f"Error updating global: {e}")
+        return figure
+    except Exception:
+        metrics.inc("callback_errors", callback="update_global")
+        logger.exception("Error in update_global")
         fig = go.Figure()
         fig.add_annotation(text=f"Error loading chart")
         return fig
@@ -1,9 +1,25 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import requests
+from requests.adapters import HTTPAdapter
+import numpy as np
 import pandas as pd
 
-GITHUB_RAW_BASE = "https://raw.githubusercontent.com/CSSEGISandData/COVID-19/master"
+GITHUB_RAW_BASE = os.environ.get("DATAVIZ_DATA_BASE_URL", "https://raw.githubusercontent.com/CSSEGISandData/COVID-19/master")
 DATA_DIR = Path(__file__).parent.parent / "data"
+CACHE_DIR_NAME = "cache"
+LOCATION_COLUMNS = ["Province/State", "Country/Region"]
+COORDINATE_COLUMNS = ["Lat", "Long"]
+DOWNLOAD_CHUNK_SIZE = 1 << 16
+REQUEST_TIMEOUT = 10
+
+_session = None
+_session_lock = threading.Lock()
 
 TIME_SERIES_CONFIRMED = (
     f"{GITHUB_RAW_BASE}/csse_covid_19_data/csse_covid_19_time_series/"
@@ -23,24 +39,144 @@ def ensure_data_dir():
     DATA_DIR.mkdir(parents=True, exist_ok=True)
 
 
-def fetch_csv(url: str, filename: str, force_refresh: bool = False) -> pd.DataFrame:
+def get_session() -> requests.Session:
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=2)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+
+def _meta_path(filepath: Path) -> Path:
+    return filepath.with_name(filepath.name + ".meta.json")
+
+
+def _read_meta(filepath: Path) -> dict:
+    try:
+        return json.loads(_meta_path(filepath).read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_meta(filepath: Path, response: requests.Response):
+    meta = {
+        "url": response.url,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified")
+    }
+    _meta_path(filepath).write_text(json.dumps(meta))
+
+
+def _download(url: str, filepath: Path, force_refresh: bool) -> bool:
+    headers = {}
+    if filepath.exists() and not force_refresh:
+        meta = _read_meta(filepath)
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    with get_session().get(url, headers=headers, timeout=REQUEST_TIMEOUT, stream=True) as response:
+        if response.status_code == 304:
+            return False
+        response.raise_for_status()
+        # Stream to a side file so a failed download never clobbers the cached copy
+        partial = filepath.with_name(filepath.name + ".part")
+        with open(partial, "wb") as f:
+            for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                f.write(chunk)
+        os.replace(partial, filepath)
+        _write_meta(filepath, response)
+    return True
+
+
+def _file_digest(filepath: Path) -> str:
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def _write_typed_cache(df: pd.DataFrame, path: Path):
+    date_columns = [str(col) for col in df.columns[4:]]
+    counts = df.iloc[:, 4:].fillna(0).to_numpy(dtype="int64")
+    # Cumulative counts fit int32 today; fall back rather than overflow silently
+    if counts.size == 0 or counts.max() <= np.iinfo(np.int32).max:
+        counts = counts.astype(np.int32)
+
+    staging = path.with_name(path.name + ".tmp")
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+    np.save(staging / "counts.npy", counts)
+    np.save(staging / "coordinates.npy", df[COORDINATE_COLUMNS].to_numpy(dtype="float64"))
+    categories = {}
+    for col in LOCATION_COLUMNS:
+        categorical = pd.Categorical(df[col])
+        np.save(staging / f"{col.replace('/', '_')}.npy", categorical.codes.astype(np.int32))
+        categories[col] = [str(value) for value in categorical.categories]
+    (staging / "meta.json").write_text(json.dumps({
+        "columns": [str(col) for col in df.columns[:4]],
+        "date_columns": date_columns,
+        "categories": categories
+    }))
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(staging, path)
+
+
+def _read_typed_cache(path: Path) -> pd.DataFrame:
+    meta = json.loads((path / "meta.json").read_text())
+    coordinates = np.load(path / "coordinates.npy")
+    locations = {
+        col: pd.Categorical.from_codes(np.load(path / f"{col.replace('/', '_')}.npy"), categories=meta["categories"][col])
+        for col in LOCATION_COLUMNS
+    }
+    locations.update({col: coordinates[:, i] for i, col in enumerate(COORDINATE_COLUMNS)})
+    head = pd.DataFrame(locations)[meta["columns"]]
+    counts = pd.DataFrame(np.load(path / "counts.npy", mmap_mode="r"), columns=meta["date_columns"], copy=False)
+    return pd.concat([head, counts], axis=1)
+
+
+def load_typed(filepath: Path) -> pd.DataFrame:
+    cache_dir = filepath.parent / CACHE_DIR_NAME
+    digest = _file_digest(filepath)
+    path = cache_dir / f"{filepath.stem}-{digest}"
+    if not (path / "meta.json").exists():
+        _write_typed_cache(pd.read_csv(filepath), path)
+        # Entries for older versions of the source file are never read again
+        for stale in cache_dir.glob(f"{filepath.stem}-*"):
+            if stale != path:
+                shutil.rmtree(stale, ignore_errors=True)
+    frame = _read_typed_cache(path)
+    # Lets callers tie work (e.g. sync checkpoints) to this exact version of the source
+    frame.attrs["source_digest"] = digest
+    return frame
+
+
+def fetch_csv(url: str, filename: str, force_refresh: bool = False, revalidate: bool = True) -> pd.DataFrame:
     ensure_data_dir()
     filepath = DATA_DIR / filename
     
-    if filepath.exists() and not force_refresh:
+    if filepath.exists() and not force_refresh and not revalidate:
         print(f"Loading {filename} from cache...")
-        return pd.read_csv(filepath)
+        return load_typed(filepath)
     
     print(f"Downloading {filename}...")
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        filepath.write_text(response.text)
-        print(f"Saved to {filepath}")
-        return pd.read_csv(filepath)
+        if _download(url, filepath, force_refresh):
+            print(f"Saved to {filepath}")
+        else:
+            print(f"{filename} is unchanged upstream, loading from cache...")
     except requests.RequestException as e:
-        print(f"Error fetching {filename}: {e}")
-        raise
+        if filepath.exists() and not force_refresh:
+            print(f"Error fetching {filename}: {e} - using cached copy")
+        else:
+            print(f"Error fetching {filename}: {e}")
+            raise
+    return load_typed(filepath)
 
 
 def load_confirmed(force_refresh: bool = False) -> pd.DataFrame:
@@ -55,6 +191,13 @@ def load_recovered(force_refresh: bool = False) -> pd.DataFrame:
     return fetch_csv(TIME_SERIES_RECOVERED, "recovered.csv", force_refresh)
 
 
+def load_all(force_refresh: bool = False):
+    loaders = (load_confirmed, load_deaths, load_recovered)
+    with ThreadPoolExecutor(max_workers=len(loaders)) as executor:
+        futures = [executor.submit(loader, force_refresh) for loader in loaders]
+        return tuple(future.result() for future in futures)
+
+
 def print_data_summary():
     print("\n" + "="*60)
     print("COVID-19 Data Summary")
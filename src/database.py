@@ -1,31 +1,184 @@
-import mysql.connector
-from mysql.connector import Error
-from typing import Optional, List, Dict
+import csv
+import os
+import tempfile
+import time
+from datetime import date
+from itertools import islice
+import threading
+import numpy as np
+import pandas as pd
+from mysql.connector import Error, FieldType
+from mysql.connector.errors import PoolError
+from mysql.connector.pooling import CNX_POOL_MAXSIZE, MySQLConnectionPool
+from typing import Optional, List, Dict, Iterable
+
+DB_HOST = os.environ.get("DATAVIZ_DB_HOST", "localhost")
+DB_USER = os.environ.get("DATAVIZ_DB_USER", "root")
+DB_PASSWORD = os.environ.get("DATAVIZ_DB_PASSWORD", "root")
+DB_NAME = os.environ.get("DATAVIZ_DB_NAME", "covid19")
+DB_BACKEND = os.environ.get("DATAVIZ_DB_BACKEND", "mysql")
+SQLITE_PATH = os.environ.get("DATAVIZ_SQLITE_PATH", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "covid19.sqlite"))
+POOL_SIZE = 5
+POOL_TIMEOUT = 10.0
+POOL_RETRY_DELAY = 0.05
+FETCH_BATCH_SIZE = 10000
+
+METRICS = ('confirmed', 'deaths', 'recovered')
+# Series derived from each cumulative metric at sync time: the daily change,
+# its 7- and 14-day means, and the growth over the last week relative to the
+# cumulative count a week earlier
+DERIVED_SUFFIXES = ('new', 'avg7', 'avg14', 'growth')
+DERIVED_METRICS = tuple(f"{metric}_{suffix}" for metric in METRICS for suffix in DERIVED_SUFFIXES)
+TREND_METRICS = METRICS + DERIVED_METRICS
+GROWTH_WINDOW = 7
+
+INTEGER_TYPES = {FieldType.TINY, FieldType.SHORT, FieldType.INT24, FieldType.LONG, FieldType.LONGLONG, FieldType.YEAR}
+DECIMAL_TYPES = {FieldType.DECIMAL, FieldType.NEWDECIMAL}
+FLOAT_TYPES = {FieldType.FLOAT, FieldType.DOUBLE}
+DATE_TYPES = {FieldType.DATE, FieldType.NEWDATE}
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+def _column_array(values: tuple, type_code: int) -> np.ndarray:
+    # SUM() over integer columns comes back as DECIMAL; the connector leaves the
+    # scale out of the description, so a DECIMAL column stays int64 only when
+    # every value in the batch is integral. NULLs force a float column
+    try:
+        if type_code in INTEGER_TYPES:
+            return np.fromiter(values, dtype='int64', count=len(values))
+        if type_code in DECIMAL_TYPES:
+            if all(value == value.to_integral_value() for value in values):
+                return np.fromiter(values, dtype='int64', count=len(values))
+            return np.fromiter(values, dtype='float64', count=len(values))
+        if type_code in DATE_TYPES:
+            days = np.fromiter(map(date.toordinal, values), dtype='int64', count=len(values)) - EPOCH_ORDINAL
+            return days.astype('datetime64[D]').astype('datetime64[s]')
+    except (TypeError, AttributeError):
+        # NULLs in the batch; take the slower paths below that map them to NaN / NaT
+        pass
+    if type_code in INTEGER_TYPES or type_code in DECIMAL_TYPES or type_code in FLOAT_TYPES:
+        return np.array(values, dtype='float64')
+    if type_code in DATE_TYPES:
+        return np.array(values, dtype='datetime64[D]').astype('datetime64[s]')
+    if type_code in FieldType.get_timestamp_types():
+        return np.array(values, dtype='datetime64[us]')
+    return np.array(values, dtype=object)
 
 class DatabaseConnection:
-    def __init__(self, host: str = "localhost", user: str = "root", password: str = "root", database: str = "covid19"):
+    dialect = "mysql"
+    backend_name = "MySQL"
+    _pools: Dict[tuple, MySQLConnectionPool] = {}
+    _pool_metrics: Dict[str, Dict] = {}
+    _pool_lock = threading.Lock()
+
+    def __init__(self, host: str = DB_HOST, user: str = DB_USER, password: str = DB_PASSWORD, database: str = DB_NAME, allow_local_infile: bool = False, pool_size: int = POOL_SIZE, pool_timeout: float = POOL_TIMEOUT):
         self.host = host
         self.user = user
         self.password = password
         self.database = database
+        self.allow_local_infile = allow_local_infile
+        # mysql.connector refuses pools above CNX_POOL_MAXSIZE
+        self.pool_size = max(1, min(pool_size, CNX_POOL_MAXSIZE))
+        self.pool_timeout = pool_timeout
         self.connection = None
     
+    def __enter__(self):
+        if not self.connect():
+            raise ConnectionError(f"Failed to connect to {self.backend_name} database")
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.disconnect()
+        return False
+
     def connect(self):
         try:
-            self.connection = mysql.connector.connect(
-                host=self.host,
-                user=self.user,
-                password=self.password,
-                database=self.database
-            )
+            pool = self._get_pool()
+            self.connection = self._checkout(pool)
             return self.connection
         except Error as e:
             print(f"Error: {e}")
             return None
     
     def disconnect(self):
-        if self.connection and self.connection.is_connected():
+        if self.connection:
+            # Closing a pooled connection hands it back to the pool
             self.connection.close()
+            self.connection = None
+            with self._pool_lock:
+                self._pool_metrics[self._pool_name()]["in_use"] -= 1
+
+    @classmethod
+    def pool_stats(cls) -> Dict[str, Dict]:
+        with cls._pool_lock:
+            return {name: dict(metrics) for name, metrics in cls._pool_metrics.items()}
+
+    def pool_capacity(self) -> int:
+        # The pool is sized by whichever connection created it first
+        with self._pool_lock:
+            metrics = self._pool_metrics.get(self._pool_name())
+            return metrics["size"] if metrics else self.pool_size
+
+    def _pool_key(self) -> tuple:
+        return (self.host, self.user, self.password, self.database, self.allow_local_infile)
+
+    def _pool_name(self) -> str:
+        suffix = "_infile" if self.allow_local_infile else ""
+        return f"{self.database}_{self.host}_{self.user}{suffix}"[:64]
+
+    def _get_pool(self) -> MySQLConnectionPool:
+        key = self._pool_key()
+        with self._pool_lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = MySQLConnectionPool(
+                    pool_name=self._pool_name(),
+                    pool_size=self.pool_size,
+                    host=self.host,
+                    user=self.user,
+                    password=self.password,
+                    database=self.database,
+                    allow_local_infile=self.allow_local_infile
+                )
+                self._pools[key] = pool
+                self._pool_metrics[pool.pool_name] = {
+                    "size": self.pool_size,
+                    "in_use": 0,
+                    "checkouts": 0,
+                    "timeouts": 0,
+                    "wait_seconds_total": 0.0,
+                    "wait_seconds_max": 0.0
+                }
+            return pool
+
+    def _checkout(self, pool: MySQLConnectionPool):
+        start = time.perf_counter()
+        metrics = self._pool_metrics[pool.pool_name]
+        while True:
+            try:
+                connection = pool.get_connection()
+                break
+            except PoolError:
+                # mysql.connector fails fast on an exhausted pool; wait for a release instead
+                if time.perf_counter() - start >= self.pool_timeout:
+                    with self._pool_lock:
+                        metrics["timeouts"] += 1
+                    raise
+                time.sleep(POOL_RETRY_DELAY)
+
+        try:
+            connection.ping(reconnect=True, attempts=2, delay=0)
+        except Error:
+            connection.close()
+            raise
+
+        waited = time.perf_counter() - start
+        with self._pool_lock:
+            metrics["in_use"] += 1
+            metrics["checkouts"] += 1
+            metrics["wait_seconds_total"] += waited
+            metrics["wait_seconds_max"] = max(metrics["wait_seconds_max"], waited)
+        return connection
     
     def execute_query(self, query: str, params: tuple = None) -> Optional[List[Dict]]:
         try:
@@ -42,6 +195,40 @@ class DatabaseConnection:
         finally:
             cursor.close()
     
+    def fetch_frame(self, query: str, params: tuple = None, batch_size: int = FETCH_BATCH_SIZE, categories: Iterable[str] = ()) -> Optional[pd.DataFrame]:
+        # Rows stream from the server on an unbuffered cursor and each batch is
+        # turned into typed column arrays straight away, so no per-row dicts
+        # are built and only one batch of Python objects is alive at a time
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(query, params or ())
+            names = [column[0] for column in cursor.description]
+            types = [column[1] for column in cursor.description]
+            batches = [[] for _ in names]
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for batch, values, type_code in zip(batches, zip(*rows), types):
+                    batch.append(_column_array(values, type_code))
+            self.connection.commit()
+        except Error as e:
+            print(f"Query error: {e}")
+            return None
+        finally:
+            cursor.close()
+
+        columns = {}
+        for name, batch, type_code in zip(names, batches, types):
+            if not batch:
+                batch = [_column_array((), type_code)]
+            # A NULL in one batch turns its ints into floats; keep the column consistent
+            if len({values.dtype for values in batch}) > 1:
+                batch = [values.astype('float64') if values.dtype == 'int64' else values for values in batch]
+            values = np.concatenate(batch) if len(batch) > 1 else batch[0]
+            columns[name] = pd.Categorical(values) if name in categories else values
+        return pd.DataFrame(columns)
+
     def insert_data(self, table: str, columns: List[str], values: List[tuple]):
         placeholders = ', '.join(['%s'] * len(columns))
         col_names = ', '.join(columns)
@@ -57,15 +244,136 @@ class DatabaseConnection:
         finally:
             cursor.close()
 
-def init_database():
-    db = DatabaseConnection()
-    if not db.connect():
-        print("Failed to connect to MySQL database")
+    def bulk_insert(self, table: str, columns: List[str], rows: Iterable[tuple], chunk_size: int = 5000, use_load_data: bool = False, update_columns: Optional[List[str]] = None) -> Dict:
+        start = time.perf_counter()
+        inserted = 0
+        failed = 0
+        rows = iter(rows)
+
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            if use_load_data:
+                ok, bad = self._load_data_chunk(table, columns, chunk, replace=bool(update_columns))
+            else:
+                ok, bad = self._insert_chunk(table, columns, chunk, update_columns)
+            inserted += ok
+            failed += bad
+
+        elapsed = time.perf_counter() - start
+        rate = inserted / elapsed if elapsed > 0 else 0.0
+        print(f"Inserted {inserted:,} rows into {table} in {elapsed:.2f}s ({rate:,.0f} rows/s, {failed:,} failed)")
+        return {"rows": inserted, "failed": failed, "seconds": elapsed, "rows_per_sec": rate}
+
+    def _insert_chunk(self, table: str, columns: List[str], chunk: List[tuple], update_columns: Optional[List[str]] = None):
+        col_names = ', '.join(columns)
+        row_placeholders = '(' + ', '.join(['%s'] * len(columns)) + ')'
+        on_duplicate = ""
+        if update_columns:
+            on_duplicate = " ON DUPLICATE KEY UPDATE " + ', '.join(f"{col} = VALUES({col})" for col in update_columns)
+        query = f"INSERT INTO {table} ({col_names}) VALUES " + ', '.join([row_placeholders] * len(chunk)) + on_duplicate
+        params = [value for row in chunk for value in row]
+
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(query, params)
+            self.connection.commit()
+            return len(chunk), 0
+        except Error as e:
+            print(f"Bulk insert error, retrying chunk row by row: {e}")
+            self.connection.rollback()
+        finally:
+            cursor.close()
+
+        # Isolate the bad rows so one of them does not cost the whole chunk
+        single_query = f"INSERT INTO {table} ({col_names}) VALUES {row_placeholders}" + on_duplicate
+        inserted = 0
+        failed = 0
+        cursor = self.connection.cursor()
+        try:
+            for row in chunk:
+                try:
+                    cursor.execute(single_query, row)
+                    inserted += 1
+                except Error as e:
+                    if failed == 0:
+                        print(f"Insert error: {e}")
+                    failed += 1
+            self.connection.commit()
+        finally:
+            cursor.close()
+        return inserted, failed
+
+    def _load_data_chunk(self, table: str, columns: List[str], chunk: List[tuple], replace: bool = False):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", newline="", delete=False) as tmp:
+            writer = csv.writer(tmp, lineterminator="\n")
+            for row in chunk:
+                writer.writerow(["\\N" if value is None else value for value in row])
+            path = tmp.name
+
+        query = f"""
+            LOAD DATA LOCAL INFILE %s {"REPLACE" if replace else ""} INTO TABLE {table}
+            FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"'
+            LINES TERMINATED BY '\\n'
+            ({', '.join(columns)})
+        """
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(query, (path,))
+            self.connection.commit()
+            # LOCAL loads downgrade bad rows to warnings and skip them;
+            # REPLACE counts a replaced row twice (delete + insert)
+            loaded = min(max(cursor.rowcount, 0), len(chunk))
+            return loaded, len(chunk) - loaded
+        except Error as e:
+            print(f"Load data error: {e}")
+            self.connection.rollback()
+            return 0, len(chunk)
+        finally:
+            cursor.close()
+            os.remove(path)
+
+def make_connection(backend: Optional[str] = None, **kwargs) -> DatabaseConnection:
+    backend = backend or DB_BACKEND
+    if backend == "mysql":
+        return DatabaseConnection(**kwargs)
+    if backend == "sqlite":
+        # Embedded single-file store; MySQL-only options (pooling, LOAD DATA) do not apply
+        from src.sqlite_database import SQLiteConnection
+        return SQLiteConnection(kwargs.get("path", SQLITE_PATH))
+    raise ValueError(f"Unknown database backend: {backend}")
+
+def _upsert_clause(db: DatabaseConnection, keys: str, columns, extra: str = "") -> str:
+    if db.dialect == "sqlite":
+        assignments = [f"{column} = excluded.{column}" for column in columns]
+        prefix = f"ON CONFLICT ({keys}) DO UPDATE SET "
+    else:
+        assignments = [f"{column} = VALUES({column})" for column in columns]
+        prefix = "ON DUPLICATE KEY UPDATE "
+    return prefix + ", ".join(assignments + ([extra] if extra else []))
+
+def pool_gauges(field: str):
+    return lambda: [({"pool": name}, stats[field]) for name, stats in DatabaseConnection.pool_stats().items()]
+
+def init_database(**kwargs):
+    # kwargs reach make_connection; the first connection in a process sizes its pool
+    try:
+        with make_connection(**kwargs) as db:
+            _create_tables(db)
+        return True
+    except ConnectionError as e:
+        print(e)
         return False
-    
+
+def _create_tables(db: DatabaseConnection):
+    if db.dialect == "sqlite":
+        from src.sqlite_database import create_tables
+        return create_tables(db)
+
     cursor = db.connection.cursor()
     
-    cursor.execute("""
+    cursor.execute(f"""
         CREATE TABLE IF NOT EXISTS covid_data (
             id INT AUTO_INCREMENT PRIMARY KEY,
             country VARCHAR(255),
@@ -76,11 +384,321 @@ def init_database():
             confirmed INT,
             deaths INT,
             recovered INT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            {_derived_columns_sql()},
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            province_key VARCHAR(255) AS (IFNULL(province, '')) STORED,
+            UNIQUE KEY uq_covid_data_region_date (country, province_key, date),
+            INDEX idx_covid_data_date (date),
+            INDEX idx_covid_data_country_date (country, date)
+        )
+    """)
+    _ensure_natural_key(cursor)
+    _ensure_derived_columns(cursor, "covid_data")
+    _ensure_index(cursor, "covid_data", "idx_covid_data_date", "date")
+    _ensure_index(cursor, "covid_data", "idx_covid_data_country_date", "country, date")
+
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS covid_daily_global (
+            date DATE PRIMARY KEY,
+            confirmed BIGINT,
+            deaths BIGINT,
+            recovered BIGINT,
+            {_derived_columns_sql()},
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        )
+    """)
+    _ensure_derived_columns(cursor, "covid_daily_global")
+
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS covid_daily_country (
+            country VARCHAR(255),
+            date DATE,
+            confirmed BIGINT,
+            deaths BIGINT,
+            recovered BIGINT,
+            {_derived_columns_sql()},
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            PRIMARY KEY (country, date)
+        )
+    """)
+    _ensure_derived_columns(cursor, "covid_daily_country")
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS covid_country_latest (
+            country VARCHAR(255) PRIMARY KEY,
+            date DATE,
+            confirmed BIGINT,
+            deaths BIGINT,
+            recovered BIGINT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS data_version (
+            id TINYINT PRIMARY KEY,
+            version BIGINT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("INSERT IGNORE INTO data_version (id, version) VALUES (1, 0)")
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sync_checkpoint (
+            run_key CHAR(64) PRIMARY KEY,
+            since DATE NULL,
+            chunks_done INT NOT NULL DEFAULT 0,
+            total_chunks INT NOT NULL,
+            started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            completed_at TIMESTAMP NULL
         )
     """)
     
     db.connection.commit()
     cursor.close()
-    db.disconnect()
-    return True
+
+def _index_exists(cursor, table: str, index: str) -> bool:
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+    """, (table, index))
+    return cursor.fetchone()[0] > 0
+
+def _ensure_index(cursor, table: str, index: str, columns: str):
+    # MySQL has no CREATE INDEX IF NOT EXISTS
+    if not _index_exists(cursor, table, index):
+        print(f"Creating index {index} on {table}...")
+        cursor.execute(f"CREATE INDEX {index} ON {table} ({columns})")
+
+def _derived_column_type(column: str) -> str:
+    return "BIGINT NULL" if column.endswith("_new") else "DOUBLE NULL"
+
+def _derived_columns_sql() -> str:
+    return ",\n            ".join(f"{column} {_derived_column_type(column)}" for column in DERIVED_METRICS)
+
+def _ensure_derived_columns(cursor, table: str):
+    # Tables created before the derived metrics existed get the columns added;
+    # their existing rows stay NULL until the next full refresh
+    cursor.execute("""
+        SELECT COLUMN_NAME FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    """, (table,))
+    existing = {row[0] for row in cursor.fetchall()}
+    missing = [column for column in DERIVED_METRICS if column not in existing]
+    if missing:
+        print(f"Adding derived metric columns to {table}...")
+        additions = ", ".join(f"ADD COLUMN {column} {_derived_column_type(column)}" for column in missing)
+        cursor.execute(f"ALTER TABLE {table} {additions}")
+
+def _ensure_natural_key(cursor):
+    # Tables created before the natural key existed may already hold duplicate
+    # rows from repeated full syncs; keep the newest copy of each observation
+    if _index_exists(cursor, "covid_data", "uq_covid_data_region_date"):
+        return
+
+    print("Adding natural key to covid_data and removing duplicate rows...")
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'covid_data'
+          AND COLUMN_NAME = 'province_key'
+    """)
+    if not cursor.fetchone()[0]:
+        cursor.execute("ALTER TABLE covid_data ADD COLUMN province_key VARCHAR(255) AS (IFNULL(province, '')) STORED")
+    cursor.execute("""
+        DELETE older FROM covid_data older
+        JOIN covid_data newer
+          ON older.country = newer.country
+         AND older.province_key = newer.province_key
+         AND older.date = newer.date
+         AND older.id < newer.id
+    """)
+    cursor.execute("ALTER TABLE covid_data ADD UNIQUE KEY uq_covid_data_region_date (country, province_key, date)")
+
+def get_max_synced_date(db: DatabaseConnection):
+    result = db.execute_query("SELECT MAX(date) AS max_date FROM covid_data")
+    return result[0]['max_date'] if result else None
+
+def get_data_version(db: DatabaseConnection) -> Optional[int]:
+    result = db.execute_query("SELECT version FROM data_version WHERE id = 1")
+    return result[0]['version'] if result else None
+
+def bump_data_version(db: DatabaseConnection):
+    cursor = db.connection.cursor()
+    cursor.execute("UPDATE data_version SET version = version + 1 WHERE id = 1")
+    db.connection.commit()
+    cursor.close()
+
+def get_pending_checkpoint(db: DatabaseConnection) -> Optional[Dict]:
+    result = db.execute_query("""
+        SELECT run_key, since, chunks_done, total_chunks FROM sync_checkpoint
+        WHERE completed_at IS NULL ORDER BY started_at DESC LIMIT 1
+    """)
+    return result[0] if result else None
+
+def save_checkpoint(db: DatabaseConnection, run_key: str, since, chunks_done: int, total_chunks: int):
+    cursor = db.connection.cursor()
+    cursor.execute(f"""
+        INSERT INTO sync_checkpoint (run_key, since, chunks_done, total_chunks)
+        VALUES (%s, %s, %s, %s)
+        {_upsert_clause(db, "run_key", ("chunks_done", "total_chunks"), "completed_at = NULL")}
+    """, (run_key, since, chunks_done, total_chunks))
+    db.connection.commit()
+    cursor.close()
+
+def complete_checkpoint(db: DatabaseConnection, run_key: str):
+    cursor = db.connection.cursor()
+    cursor.execute("UPDATE sync_checkpoint SET completed_at = CURRENT_TIMESTAMP WHERE run_key = %s", (run_key,))
+    db.connection.commit()
+    cursor.close()
+
+def discard_pending_checkpoints(db: DatabaseConnection):
+    cursor = db.connection.cursor()
+    cursor.execute("DELETE FROM sync_checkpoint WHERE completed_at IS NULL")
+    db.connection.commit()
+    cursor.close()
+
+def _aggregate_expression(column: str) -> str:
+    # Counts and moving averages add up across regions; growth is a ratio, so
+    # it is recomputed from the summed columns rather than summed itself
+    metric, _, suffix = column.partition("_")
+    if suffix == "growth":
+        base = f"SUM({metric}) - {GROWTH_WINDOW} * SUM({metric}_avg{GROWTH_WINDOW})"
+        return f"CASE WHEN {base} > 0 THEN {GROWTH_WINDOW} * SUM({metric}_avg{GROWTH_WINDOW}) / ({base}) END"
+    return f"SUM({column})"
+
+def refresh_aggregates(db: DatabaseConnection, since=None, suffix: str = ""):
+    # suffix targets a parallel set of tables, e.g. the staging copies
+    cursor = db.connection.cursor()
+
+    # Aggregates that lag behind covid_data (new tables, failed refresh) are
+    # rebuilt from their own high-water mark rather than from the sync's
+    cursor.execute(f"SELECT MAX(date) FROM covid_daily_global{suffix}")
+    aggregated_until = cursor.fetchone()[0]
+    if aggregated_until is None:
+        since = None
+    elif since is not None:
+        since = min(since, aggregated_until)
+
+    # INSERT ... SELECT needs a WHERE before SQLite's ON CONFLICT clause
+    where = "WHERE date > %s" if since is not None else "WHERE 1 = 1"
+    params = (since,) if since is not None else ()
+    columns = ", ".join(METRICS + DERIVED_METRICS)
+    aggregates = ", ".join(_aggregate_expression(column) for column in METRICS + DERIVED_METRICS)
+
+    cursor.execute(f"""
+        INSERT INTO covid_daily_country{suffix} (country, date, {columns})
+        SELECT country, date, {aggregates}
+        FROM covid_data{suffix} {where}
+        GROUP BY country, date
+        {_upsert_clause(db, "country, date", METRICS + DERIVED_METRICS)}
+    """, params)
+
+    cursor.execute(f"""
+        INSERT INTO covid_daily_global{suffix} (date, {columns})
+        SELECT date, {aggregates}
+        FROM covid_daily_country{suffix} {where}
+        GROUP BY date
+        {_upsert_clause(db, "date", METRICS + DERIVED_METRICS)}
+    """, params)
+
+    cursor.execute(f"""
+        INSERT INTO covid_country_latest{suffix} (country, date, confirmed, deaths, recovered)
+        SELECT d.country, d.date, d.confirmed, d.deaths, d.recovered
+        FROM covid_daily_country{suffix} d
+        JOIN (SELECT country, MAX(date) AS date FROM covid_daily_country{suffix} GROUP BY country) latest
+          ON d.country = latest.country AND d.date = latest.date
+        WHERE 1 = 1
+        {_upsert_clause(db, "country", ("date",) + METRICS)}
+    """)
+
+    db.connection.commit()
+    cursor.close()
+
+STAGING_SUFFIX = "_staging"
+# Everything the dashboard reads; swapped together so readers never mix generations
+SWAP_TABLES = ("covid_data", "covid_daily_country", "covid_daily_global", "covid_country_latest")
+
+def create_staging_tables(db: DatabaseConnection, tables=SWAP_TABLES):
+    if db.dialect == "sqlite":
+        from src.sqlite_database import create_staging_tables as create_sqlite_staging_tables
+        return create_sqlite_staging_tables(db, tables, STAGING_SUFFIX)
+
+    cursor = db.connection.cursor()
+    for table in tables:
+        cursor.execute(f"DROP TABLE IF EXISTS {table}{STAGING_SUFFIX}")
+        cursor.execute(f"CREATE TABLE {table}{STAGING_SUFFIX} LIKE {table}")
+    db.connection.commit()
+    cursor.close()
+
+def staging_tables_exist(db: DatabaseConnection, tables=SWAP_TABLES) -> bool:
+    names = tuple(f"{table}{STAGING_SUFFIX}" for table in tables)
+    placeholders = ", ".join(["%s"] * len(names))
+    if db.dialect == "sqlite":
+        query = f"SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN ({placeholders})"
+    else:
+        query = f"SELECT COUNT(*) FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN ({placeholders})"
+    cursor = db.connection.cursor()
+    cursor.execute(query, names)
+    count = cursor.fetchone()[0]
+    cursor.close()
+    return count == len(names)
+
+def swap_staging_tables(db: DatabaseConnection, tables=SWAP_TABLES):
+    if db.dialect == "sqlite":
+        from src.sqlite_database import swap_staging_tables as swap_sqlite_staging_tables
+        return swap_sqlite_staging_tables(db, tables, STAGING_SUFFIX)
+
+    cursor = db.connection.cursor()
+    cursor.execute("DROP TABLE IF EXISTS " + ", ".join(f"{table}_old" for table in tables))
+    # A single RENAME TABLE is atomic: readers see all old tables or all new ones
+    renames = []
+    for table in tables:
+        renames += [f"{table} TO {table}_old", f"{table}{STAGING_SUFFIX} TO {table}"]
+    cursor.execute("RENAME TABLE " + ", ".join(renames))
+    cursor.execute("DROP TABLE " + ", ".join(f"{table}_old" for table in tables))
+    db.connection.commit()
+    cursor.close()
+
+def _check_metric(metric: str, allowed: tuple = METRICS):
+    # Metric names are interpolated into SQL, so only known columns pass
+    if metric not in allowed:
+        raise ValueError(f"Unknown metric: {metric}")
+
+def build_trend_query(metric: str, country: Optional[str] = None, raw: bool = False):
+    _check_metric(metric, TREND_METRICS if not raw else METRICS)
+    if raw:
+        where = "WHERE country = %s" if country else ""
+        query = f"SELECT date, SUM({metric}) AS {metric} FROM covid_data {where} GROUP BY date ORDER BY date"
+    elif country:
+        query = f"SELECT date, {metric} FROM covid_daily_country WHERE country = %s ORDER BY date"
+    else:
+        query = f"SELECT date, {metric} FROM covid_daily_global ORDER BY date"
+    return query, (country,) if country else ()
+
+def build_top_countries_query(metric: str, limit: int = 15, raw: bool = False):
+    _check_metric(metric)
+    if raw:
+        query = f"""
+            SELECT country, SUM({metric}) AS {metric} FROM covid_data
+            WHERE date = (SELECT MAX(date) FROM covid_data)
+            GROUP BY country ORDER BY {metric} DESC LIMIT %s
+        """
+    else:
+        query = f"SELECT country, {metric} FROM covid_country_latest ORDER BY {metric} DESC LIMIT %s"
+    return query, (limit,)
+
+def build_countries_query(raw: bool = False):
+    if raw:
+        return "SELECT DISTINCT country FROM covid_data ORDER BY country", ()
+    return "SELECT country FROM covid_country_latest ORDER BY country", ()
+
+def build_latest_totals_query(raw: bool = False):
+    if raw:
+        query = """
+            SELECT date, SUM(confirmed) AS confirmed, SUM(deaths) AS deaths, SUM(recovered) AS recovered
+            FROM covid_data WHERE date = (SELECT MAX(date) FROM covid_data) GROUP BY date
+        """
+    else:
+        query = "SELECT date, confirmed, deaths, recovered FROM covid_daily_global ORDER BY date DESC LIMIT 1"
+    return query, ()
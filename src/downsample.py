@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+
+def _as_float(values) -> np.ndarray:
+    values = np.asarray(values)
+    if values.dtype == object or np.issubdtype(values.dtype, np.datetime64):
+        return pd.to_datetime(values).to_numpy(dtype="datetime64[ns]").astype("int64").astype("float64")
+    return values.astype("float64")
+
+
+def lttb_indices(x, y, n_out: int) -> np.ndarray:
+    x = _as_float(x)
+    y = _as_float(y)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # n_out - 2 buckets over the interior points; first and last are always kept
+    edges = np.linspace(1, n - 1, n_out - 1).astype("int64")
+    counts = np.diff(edges)
+    avg_x = np.add.reduceat(x[:n - 1], edges[:-1]) / counts
+    avg_y = np.add.reduceat(y[:n - 1], edges[:-1]) / counts
+    # Each bucket is scored against the mean of the next one (the last point for the final bucket)
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    selected = np.empty(n_out, dtype="int64")
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        areas = np.abs((x[a] - next_x[i]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y[i] - y[a]))
+        a = lo + int(np.argmax(areas))
+        selected[i + 1] = a
+    return selected
+
+
+def minmax_indices(y, n_out: int) -> np.ndarray:
+    y = _as_float(y)
+    n = len(y)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+
+    # Keep the lowest and highest point of each bucket, plus both endpoints
+    n_buckets = (n_out - 2) // 2
+    buckets = (np.arange(n) * n_buckets) // n
+    order = np.lexsort((y, buckets))
+    starts = np.searchsorted(buckets[order], np.arange(n_buckets))
+    ends = np.append(starts[1:], n) - 1
+    keep = np.concatenate(([0, n - 1], order[starts], order[ends]))
+    return np.unique(keep)
+
+
+def downsample_frame(df: pd.DataFrame, x: str, y: str, n_out: int, method: str = "lttb") -> pd.DataFrame:
+    if len(df) <= n_out:
+        return df
+    if method == "lttb":
+        indices = lttb_indices(df[x].to_numpy(), df[y].to_numpy(), n_out)
+    elif method == "minmax":
+        indices = minmax_indices(df[y].to_numpy(), n_out)
+    else:
+        raise ValueError(f"Unknown downsampling method: {method}")
+    return df.iloc[indices]
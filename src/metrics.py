@@ -0,0 +1,116 @@
+import functools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+METRIC_PREFIX = "dataviz_"
+SAMPLE_WINDOW = 1024
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _label_key(labels: Dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: tuple, extra: Dict = None) -> str:
+    pairs = list(key) + sorted((extra or {}).items())
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class Metrics:
+    def __init__(self, window: int = SAMPLE_WINDOW):
+        self.window = window
+        self._counters: Dict[str, Dict[tuple, float]] = {}
+        self._timings: Dict[str, Dict[tuple, Dict]] = {}
+        self._gauges: Dict[str, Callable[[], List[Tuple[Dict, float]]]] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._timings.setdefault(name, {})
+            entry = series.get(key)
+            if entry is None:
+                # Quantiles come from a sliding window; count and sum cover the whole lifetime
+                entry = series[key] = {"samples": deque(maxlen=self.window), "count": 0, "sum": 0.0}
+            entry["samples"].append(seconds)
+            entry["count"] += 1
+            entry["sum"] += seconds
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def timed(self, name: str, **labels):
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.timer(name, **labels):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def register_gauges(self, name: str, collect: Callable[[], List[Tuple[Dict, float]]]):
+        # collect() returns [(labels dict, value), ...] and is evaluated at scrape time
+        with self._lock:
+            self._gauges[name] = collect
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {
+                "counters": {name: dict(series) for name, series in self._counters.items()},
+                "timings": {
+                    name: {key: {"count": e["count"], "sum": e["sum"], "samples": list(e["samples"])} for key, e in series.items()}
+                    for name, series in self._timings.items()
+                },
+                "gauges": dict(self._gauges)
+            }
+
+    def render_prometheus(self) -> str:
+        snapshot = self.snapshot()
+        lines = []
+        for name, series in sorted(snapshot["counters"].items()):
+            metric = f"{METRIC_PREFIX}{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for key, value in sorted(series.items()):
+                lines.append(f"{metric}{_format_labels(key)} {value:g}")
+        for name, series in sorted(snapshot["timings"].items()):
+            metric = f"{METRIC_PREFIX}{name}_seconds"
+            lines.append(f"# TYPE {metric} summary")
+            for key, entry in sorted(series.items()):
+                values = np.percentile(entry["samples"], [q * 100 for q in QUANTILES])
+                for q, value in zip(QUANTILES, values):
+                    lines.append(f"{metric}{_format_labels(key, {'quantile': str(q)})} {value:.6f}")
+                lines.append(f"{metric}_sum{_format_labels(key)} {entry['sum']:.6f}")
+                lines.append(f"{metric}_count{_format_labels(key)} {entry['count']}")
+        for name, collect in sorted(snapshot["gauges"].items()):
+            metric = f"{METRIC_PREFIX}{name}"
+            try:
+                values = collect()
+            except Exception:
+                continue
+            lines.append(f"# TYPE {metric} gauge")
+            for labels, value in values:
+                if value is not None:
+                    lines.append(f"{metric}{_format_labels(_label_key(labels))} {float(value):g}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
@@ -0,0 +1,293 @@
+import os
+import re
+import sqlite3
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+from mysql.connector import Error
+
+from src.database import FETCH_BATCH_SIZE, SQLITE_PATH, DatabaseConnection, _derived_columns_sql, _upsert_clause
+
+BUSY_TIMEOUT = 30.0
+# Natural key of covid_data and its staging copy, the only tables loaded with upserts
+UPSERT_KEYS = "country, province_key, date"
+
+
+class _Cursor:
+    # Accepts the connector-style %s placeholders the shared SQL is written
+    # with, and raises the connector's Error so callers handle both backends alike
+    def __init__(self, cursor: sqlite3.Cursor, dictionary: bool = False):
+        self._cursor = cursor
+        self.dictionary = dictionary
+
+    def execute(self, query: str, params=None):
+        try:
+            self._cursor.execute(query.replace("%s", "?"), tuple(params or ()))
+        except sqlite3.Error as e:
+            raise Error(msg=str(e)) from e
+
+    def executemany(self, query: str, rows):
+        try:
+            self._cursor.executemany(query.replace("%s", "?"), rows)
+        except sqlite3.Error as e:
+            raise Error(msg=str(e)) from e
+
+    def _convert(self, rows):
+        if not self.dictionary:
+            return rows
+        names = [column[0] for column in self._cursor.description]
+        return [dict(zip(names, row)) for row in rows]
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        return self._convert([row])[0] if row is not None else None
+
+    def fetchmany(self, size: int):
+        return self._convert(self._cursor.fetchmany(size))
+
+    def fetchall(self):
+        return self._convert(self._cursor.fetchall())
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def close(self):
+        self._cursor.close()
+
+
+class _Connection:
+    def __init__(self, connection: sqlite3.Connection):
+        self._connection = connection
+
+    def cursor(self, dictionary: bool = False):
+        return _Cursor(self._connection.cursor(), dictionary)
+
+    def commit(self):
+        self._connection.commit()
+
+    def rollback(self):
+        self._connection.rollback()
+
+    def close(self):
+        self._connection.close()
+
+
+class SQLiteConnection(DatabaseConnection):
+    dialect = "sqlite"
+    backend_name = "SQLite"
+
+    def __init__(self, path: str = SQLITE_PATH):
+        self.path = path
+        self.allow_local_infile = False
+        self.connection = None
+
+    def connect(self):
+        try:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, check_same_thread=False)
+            # WAL lets dashboard readers keep going while a sync writes
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection = _Connection(connection)
+            return self.connection
+        except (sqlite3.Error, OSError) as e:
+            print(f"Error: {e}")
+            return None
+
+    def disconnect(self):
+        if self.connection:
+            self.connection.close()
+            self.connection = None
+
+    def pool_capacity(self) -> int:
+        # One writer at a time; parallel loads would only queue on the file lock
+        return 1
+
+    def fetch_frame(self, query: str, params: tuple = None, batch_size: int = FETCH_BATCH_SIZE, categories: Iterable[str] = ()) -> Optional[pd.DataFrame]:
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(query, params)
+            names = [column[0] for column in cursor.description]
+            batches = []
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                batches.append(pd.DataFrame.from_records(rows, columns=names))
+        except Error as e:
+            print(f"Query error: {e}")
+            return None
+        finally:
+            cursor.close()
+
+        df = pd.concat(batches, ignore_index=True) if len(batches) > 1 else (batches[0] if batches else pd.DataFrame(columns=names))
+        # Dates are stored as ISO text
+        if "date" in df.columns:
+            df["date"] = pd.to_datetime(df["date"])
+        for name in categories:
+            if name in df.columns:
+                df[name] = df[name].astype("category")
+        return df
+
+    def bulk_insert(self, table: str, columns: List[str], rows: Iterable[tuple], chunk_size: int = 5000, use_load_data: bool = False, update_columns: Optional[List[str]] = None) -> Dict:
+        # There is no LOAD DATA; executemany over a prepared statement is SQLite's fast path
+        return super().bulk_insert(table, columns, rows, chunk_size=chunk_size, use_load_data=False, update_columns=update_columns)
+
+    def _insert_chunk(self, table: str, columns: List[str], chunk: List[tuple], update_columns: Optional[List[str]] = None):
+        # ON CONFLICT DO UPDATE keeps id and created_at, like MySQL's ON DUPLICATE KEY UPDATE
+        query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+        if update_columns:
+            query += " " + _upsert_clause(self, UPSERT_KEYS, update_columns)
+        cursor = self.connection.cursor()
+        try:
+            cursor.executemany(query, chunk)
+            self.connection.commit()
+            return len(chunk), 0
+        except Error as e:
+            print(f"Bulk insert error, retrying chunk row by row: {e}")
+            self.connection.rollback()
+
+        inserted = 0
+        failed = 0
+        try:
+            for row in chunk:
+                try:
+                    cursor.execute(query, row)
+                    inserted += 1
+                except Error as e:
+                    if failed == 0:
+                        print(f"Insert error: {e}")
+                    failed += 1
+            self.connection.commit()
+        finally:
+            cursor.close()
+        return inserted, failed
+
+
+def create_tables(db: SQLiteConnection):
+    # Same tables as the MySQL schema; SQLite has no ON UPDATE timestamps, so
+    # updated_at only records when a row was first written
+    cursor = db.connection.cursor()
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS covid_data (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            country TEXT,
+            province TEXT,
+            latitude REAL,
+            longitude REAL,
+            date TEXT,
+            confirmed INTEGER,
+            deaths INTEGER,
+            recovered INTEGER,
+            {_derived_columns_sql()},
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            province_key TEXT AS (IFNULL(province, '')) STORED,
+            UNIQUE (country, province_key, date)
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_covid_data_date ON covid_data (date)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_covid_data_country_date ON covid_data (country, date)")
+
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS covid_daily_global (
+            date TEXT PRIMARY KEY,
+            confirmed INTEGER,
+            deaths INTEGER,
+            recovered INTEGER,
+            {_derived_columns_sql()},
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS covid_daily_country (
+            country TEXT,
+            date TEXT,
+            confirmed INTEGER,
+            deaths INTEGER,
+            recovered INTEGER,
+            {_derived_columns_sql()},
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (country, date)
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS covid_country_latest (
+            country TEXT PRIMARY KEY,
+            date TEXT,
+            confirmed INTEGER,
+            deaths INTEGER,
+            recovered INTEGER,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS data_version (
+            id INTEGER PRIMARY KEY,
+            version INTEGER NOT NULL,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("INSERT OR IGNORE INTO data_version (id, version) VALUES (1, 0)")
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sync_checkpoint (
+            run_key TEXT PRIMARY KEY,
+            since TEXT NULL,
+            chunks_done INTEGER NOT NULL DEFAULT 0,
+            total_chunks INTEGER NOT NULL,
+            started_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            completed_at TEXT NULL
+        )
+    """)
+
+    db.connection.commit()
+    cursor.close()
+
+
+def create_staging_tables(db: SQLiteConnection, tables, suffix: str):
+    # No CREATE TABLE ... LIKE; replay the stored DDL under the staging name.
+    # Secondary indexes are left off and built once the table is swapped in.
+    cursor = db.connection.cursor()
+    for table in tables:
+        cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = %s", (table,))
+        ddl = cursor.fetchone()[0]
+        cursor.execute(f"DROP TABLE IF EXISTS {table}{suffix}")
+        # A renamed table's stored DDL carries its name quoted
+        cursor.execute(re.sub(rf'^CREATE TABLE\s+"?{table}"?(?=[\s(])', f"CREATE TABLE {table}{suffix}", ddl, count=1))
+    db.connection.commit()
+    cursor.close()
+
+
+def swap_staging_tables(db: SQLiteConnection, tables, suffix: str):
+    cursor = db.connection.cursor()
+    placeholders = ", ".join(["%s"] * len(tables))
+    # Captured before the renames, which rewrite index DDL to follow the old tables
+    cursor.execute(f"SELECT sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL AND tbl_name IN ({placeholders})", tuple(tables))
+    indexes = [row[0] for row in cursor.fetchall()]
+
+    # SQLite DDL is transactional, so WAL readers keep the old tables until the commit
+    db.connection.commit()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        for table in tables:
+            cursor.execute(f"ALTER TABLE {table} RENAME TO {table}_old")
+            cursor.execute(f"ALTER TABLE {table}{suffix} RENAME TO {table}")
+            cursor.execute(f"DROP TABLE {table}_old")
+        for ddl in indexes:
+            cursor.execute(ddl)
+        db.connection.commit()
+    except Error:
+        db.connection.rollback()
+        raise
+    finally:
+        cursor.close()
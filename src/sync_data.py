@@ -1,69 +1,352 @@
-from src.data_fetch import load_confirmed, load_deaths, load_recovered
-from src.database import DatabaseConnection, init_database
+from src.data_fetch import load_all
+from src.database import (
+    DERIVED_METRICS, GROWTH_WINDOW, METRICS, POOL_SIZE, DatabaseConnection, make_connection, init_database, get_max_synced_date,
+    refresh_aggregates, bump_data_version, create_staging_tables, staging_tables_exist, swap_staging_tables, STAGING_SUFFIX,
+    get_pending_checkpoint, save_checkpoint, complete_checkpoint, discard_pending_checkpoints
+)
+from src.metrics import metrics
+import hashlib
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from itertools import islice
+import numpy as np
 import pandas as pd
-from datetime import datetime
+from numpy.lib.stride_tricks import sliding_window_view
 
-def parse_date(date_str):
+KEY_COLUMNS = ['country', 'province']
+COVID_DATA_COLUMNS = ['country', 'province', 'latitude', 'longitude', 'date', 'confirmed', 'deaths', 'recovered'] + list(DERIVED_METRICS)
+UPSERT_COLUMNS = ['latitude', 'longitude', 'confirmed', 'deaths', 'recovered'] + list(DERIVED_METRICS)
+ROLLING_WINDOWS = (7, 14)
+# Dates before the first loaded one that the derived series need (longest window plus the diff)
+DERIVED_HISTORY = max(ROLLING_WINDOWS)
+# Upper bound on reshaped rows held in memory at once; each chunk is committed before the next is built
+SYNC_CHUNK_ROWS = 200_000
+
+def parse_date_columns(columns) -> pd.Series:
+    # Parse every date header once; unparseable headers map to NaT and are dropped
+    parsed = pd.to_datetime(pd.Series(columns, dtype=object), format='mixed', errors='coerce')
+    parsed.index = columns
+    return parsed.dropna()
+
+def _region_keys(df: pd.DataFrame) -> pd.DataFrame:
+    return pd.DataFrame({
+        'country': df['Country/Region'].astype(object).to_numpy(),
+        'province': df['Province/State'].astype(object).where(df['Province/State'].notna(), None).to_numpy()
+    })
+
+def _gather_metric(df: pd.DataFrame, rows: np.ndarray, dates: pd.Series) -> np.ndarray:
+    # Only the matched rows are materialized, so a chunk of regions costs the
+    # size of the chunk even when df is the full (memory-mapped) source
+    values = np.full((len(rows), len(dates)), np.nan)
+    found = rows >= 0
+    values[found] = df.iloc[rows[found]].reindex(columns=dates.index).to_numpy(dtype='float64')
+    return values
+
+def derive_metrics(values: np.ndarray) -> dict:
+    # values is regions x dates of cumulative counts in date order; any window
+    # that reaches before the first column comes out NaN
+    new = np.diff(values, axis=1, prepend=np.nan)
+    derived = {'new': new}
+    for window in ROLLING_WINDOWS:
+        means = np.full_like(new, np.nan)
+        if new.shape[1] >= window:
+            means[:, window - 1:] = sliding_window_view(new, window, axis=1).mean(axis=-1)
+        derived[f'avg{window}'] = means
+    # Cumulative minus the last week of new cases is the count a week earlier
+    weekly = derived[f'avg{GROWTH_WINDOW}']
+    base = values - GROWTH_WINDOW * weekly
+    with np.errstate(divide='ignore', invalid='ignore'):
+        derived['growth'] = np.where(base > 0, GROWTH_WINDOW * weekly / base, np.nan)
+    return derived
+
+def reshape_covid_data(df_confirmed: pd.DataFrame, df_deaths: pd.DataFrame, df_recovered: pd.DataFrame, since=None) -> pd.DataFrame:
+    all_dates = parse_date_columns(df_confirmed.columns[4:]).sort_values()
+    loaded = np.ones(len(all_dates), dtype=bool) if since is None else (all_dates > pd.Timestamp(since)).to_numpy()
+    dates = all_dates[loaded]
+    n_dates = len(dates)
+    # Incremental loads still read enough earlier dates to fill the rolling windows
+    first = int(np.argmax(loaded)) if loaded.any() else len(all_dates)
+    window_start = max(0, first - DERIVED_HISTORY)
+    window_dates = all_dates.iloc[window_start:]
+    offset = first - window_start
+
+    regions = _region_keys(df_confirmed)
+    lookups = {}
+    for metric, df in (('deaths', df_deaths), ('recovered', df_recovered)):
+        # The old per-row lookup only ever matched the first region with a given key
+        keys = _region_keys(df).drop_duplicates(KEY_COLUMNS)
+        lookups[metric] = keys.assign(**{f'{metric}_row': keys.index})
+    joined = regions.merge(lookups['deaths'], on=KEY_COLUMNS, how='left', sort=False)
+    joined = joined.merge(lookups['recovered'], on=KEY_COLUMNS, how='left', sort=False)
+
+    frame = pd.DataFrame({
+        'country': regions['country'].to_numpy().repeat(n_dates),
+        'province': regions['province'].to_numpy().repeat(n_dates),
+        'latitude': df_confirmed['Lat'].to_numpy(dtype='float64').repeat(n_dates),
+        'longitude': df_confirmed['Long'].to_numpy(dtype='float64').repeat(n_dates),
+        'date': np.tile(dates.to_numpy(), len(regions))
+    })
+    matrices = {'confirmed': df_confirmed.reindex(columns=window_dates.index).to_numpy(dtype='float64')}
+    for metric, df in (('deaths', df_deaths), ('recovered', df_recovered)):
+        rows = joined[f'{metric}_row'].fillna(-1).to_numpy(dtype='int64')
+        matrices[metric] = _gather_metric(df, rows, window_dates)
+
+    for metric in METRICS:
+        values = np.nan_to_num(matrices[metric], nan=0.0)
+        frame[metric] = values[:, offset:].reshape(-1).astype('int64')
+        for suffix, derived in derive_metrics(values).items():
+            column = derived[:, offset:].reshape(-1)
+            frame[f'{metric}_{suffix}'] = pd.array(column, dtype='Int64') if suffix == 'new' else column
+
+    return frame[COVID_DATA_COLUMNS]
+
+def iter_covid_rows(frame: pd.DataFrame):
+    # Plain Python values per column; numpy scalars, NaN and NA are not accepted by the connector
+    columns = []
+    for name in COVID_DATA_COLUMNS:
+        if name == 'date':
+            columns.append(frame['date'].dt.strftime('%Y-%m-%d').tolist())
+        elif name in METRICS:
+            columns.append(frame[name].tolist())
+        else:
+            values = frame[name]
+            columns.append(values.astype(object).where(values.notna(), None).tolist())
+    return zip(*columns)
+
+def regions_per_chunk(n_dates: int, chunk_rows: int = SYNC_CHUNK_ROWS) -> int:
+    return max(1, chunk_rows // max(1, n_dates))
+
+def iter_covid_chunks(df_confirmed: pd.DataFrame, df_deaths: pd.DataFrame, df_recovered: pd.DataFrame, since=None, chunk_regions: int = 100, start_chunk: int = 0):
+    # Yields (chunk index, long frame) for consecutive slices of confirmed regions;
+    # deaths and recovered stay whole since only matching rows are gathered per chunk
+    for index, start in enumerate(range(0, len(df_confirmed), chunk_regions)):
+        if index < start_chunk:
+            continue
+        chunk = df_confirmed.iloc[start:start + chunk_regions]
+        yield index, reshape_covid_data(chunk, df_deaths, df_recovered, since=since)
+
+_worker_sources = None
+
+def _init_reshape_worker(df_confirmed, df_deaths, df_recovered, since):
+    # Sources are shipped to each worker process once instead of with every task
+    global _worker_sources
+    _worker_sources = (df_confirmed, df_deaths, df_recovered, since)
+
+def _reshape_slice(start: int, stop: int) -> pd.DataFrame:
+    df_confirmed, df_deaths, df_recovered, since = _worker_sources
+    return reshape_covid_data(df_confirmed.iloc[start:stop], df_deaths, df_recovered, since=since)
+
+def iter_covid_chunks_parallel(df_confirmed: pd.DataFrame, df_deaths: pd.DataFrame, df_recovered: pd.DataFrame, since=None, chunk_regions: int = 100, start_chunk: int = 0, workers: int = 2):
+    # Same chunks as iter_covid_chunks, reshaped across a process pool and yielded
+    # as they finish; at most two chunks per worker are held in memory at once
+    total_chunks = -(-len(df_confirmed) // chunk_regions)
+    pending = iter(range(start_chunk, total_chunks))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_reshape_worker, initargs=(df_confirmed, df_deaths, df_recovered, since)) as pool:
+        running = {}
+
+        def submit(count):
+            for index in islice(pending, count):
+                start = index * chunk_regions
+                running[pool.submit(_reshape_slice, start, start + chunk_regions)] = index
+
+        submit(workers * 2)
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = running.pop(future)
+                submit(1)
+                yield index, future.result()
+
+def sync_run_key(frames, since, chunk_regions: int, table: str = "covid_data") -> str:
+    # A checkpoint only applies to the same sources cut into the same chunks and loaded into the same table
+    parts = [str(df.attrs.get("source_digest", len(df))) for df in frames]
+    parts += [str(since), str(chunk_regions), table]
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+def _load_chunk(db: DatabaseConnection, frame: pd.DataFrame, chunk_size: int, use_load_data: bool, table: str = "covid_data") -> dict:
+    return db.bulk_insert(
+        table,
+        COVID_DATA_COLUMNS,
+        iter_covid_rows(frame),
+        chunk_size=chunk_size,
+        use_load_data=use_load_data,
+        update_columns=UPSERT_COLUMNS
+    )
+
+def _load_chunk_pooled(frame: pd.DataFrame, chunk_size: int, use_load_data: bool, table: str) -> dict:
+    with make_connection(allow_local_infile=use_load_data) as db:
+        return _load_chunk(db, frame, chunk_size, use_load_data, table)
+
+def load_chunks(db: DatabaseConnection, chunks, run_key: str, since, start_chunk: int, total_chunks: int, chunk_size: int = 5000, use_load_data: bool = False, load_workers: int = 1, timings: dict = None, table: str = "covid_data") -> dict:
+    # Chunks cover disjoint regions, so they can be written in any order and on
+    # any connection. The checkpoint only advances over a contiguous run of
+    # finished chunks; anything past it is replayed on resume, which the upsert
+    # turns into a no-op.
+    stats = {"rows": 0, "failed": 0, "seconds": 0.0, "rows_per_sec": 0.0, "chunks": 0}
+    timings = timings if timings is not None else {}
+    finished = set()
+    checkpoint = start_chunk
+    wait_seconds = 0.0
+    start = time.perf_counter()
+
+    def record(index, chunk_stats):
+        nonlocal checkpoint
+        finished.add(index)
+        while checkpoint in finished:
+            finished.discard(checkpoint)
+            checkpoint += 1
+        save_checkpoint(db, run_key, since, checkpoint, total_chunks)
+        for key in ("rows", "failed"):
+            stats[key] += chunk_stats[key]
+        stats["chunks"] += 1
+        metrics.inc("sync_rows", chunk_stats["rows"])
+        metrics.inc("sync_failed_rows", chunk_stats["failed"])
+
+    def next_chunk():
+        nonlocal wait_seconds
+        wait_start = time.perf_counter()
+        item = next(chunks, None)
+        wait_seconds += time.perf_counter() - wait_start
+        return item
+
+    if load_workers > 1:
+        with ThreadPoolExecutor(max_workers=load_workers) as loaders:
+            running = {}
+            while True:
+                item = next_chunk()
+                if item is None:
+                    break
+                if len(running) >= load_workers:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        record(running.pop(future), future.result())
+                index, frame = item
+                running[loaders.submit(_load_chunk_pooled, frame, chunk_size, use_load_data, table)] = index
+                del item, frame
+            for future in wait(running).done:
+                record(running[future], future.result())
+    else:
+        while True:
+            item = next_chunk()
+            if item is None:
+                break
+            index, frame = item
+            record(index, _load_chunk(db, frame, chunk_size, use_load_data, table))
+            del item, frame
+
+    elapsed = time.perf_counter() - start
+    # Time spent waiting on the next chunk is the reshape; the rest is the load
+    timings["reshape"] = wait_seconds
+    timings["load"] = elapsed - wait_seconds
+    stats["seconds"] = elapsed
+    stats["rows_per_sec"] = stats["rows"] / elapsed if elapsed > 0 else 0.0
+    return stats
+
+@contextmanager
+def sync_phase(name: str, timings: dict):
+    start = time.perf_counter()
     try:
-        return pd.to_datetime(date_str).strftime('%Y-%m-%d')
-    except:
-        return None
+        yield
+    finally:
+        timings[name] = time.perf_counter() - start
+        metrics.observe("sync_phase", timings[name], phase=name)
 
-def sync_covid_data():
+def sync_covid_data(chunk_size: int = 5000, use_load_data: bool = False, full_refresh: bool = False, chunk_rows: int = SYNC_CHUNK_ROWS, workers: int = 1, staging: bool = False):
+    # staging rebuilds every table the dashboard reads under a staging name and
+    # swaps them in at the end, so readers never see a half-loaded generation
+    timings = {}
+    suffix = STAGING_SUFFIX if staging else ""
+    table = f"covid_data{suffix}"
+
+    # One pooled connection per loader plus one for checkpoints and aggregates.
+    # init_database opens the process's first connection, so it sizes the pool
+    pool_size = max(POOL_SIZE, workers + 1)
     print("Initializing database...")
-    init_database()
-    
+    with sync_phase("init", timings):
+        init_database(pool_size=pool_size)
+
     print("Loading COVID-19 data from GitHub...")
-    df_confirmed = load_confirmed()
-    df_deaths = load_deaths()
-    df_recovered = load_recovered()
-    
-    db = DatabaseConnection()
-    db.connect()
-    
-    print("Processing and inserting data into MySQL...")
-    
-    cursor = db.connection.cursor()
-    
-    date_columns = df_confirmed.columns[4:]
-    
-    for idx, row in df_confirmed.iterrows():
-        country = row['Country/Region']
-        province = row['Province/State'] if pd.notna(row['Province/State']) else None
-        latitude = row['Lat'] if pd.notna(row['Lat']) else None
-        longitude = row['Long'] if pd.notna(row['Long']) else None
-        
-        for date_col in date_columns:
-            parsed_date = parse_date(date_col)
-            if not parsed_date:
-                continue
-                
-            confirmed = int(row[date_col]) if pd.notna(row[date_col]) else 0
-            
-            deaths_idx = (df_deaths['Country/Region'] == country) & (df_deaths['Province/State'] == province if pd.notna(province) else df_deaths['Province/State'].isna())
-            deaths_val = int(df_deaths.loc[deaths_idx, date_col].values[0]) if len(df_deaths.loc[deaths_idx, date_col].values) > 0 else 0
-            
-            recovered_idx = (df_recovered['Country/Region'] == country) & (df_recovered['Province/State'] == province if pd.notna(province) else df_recovered['Province/State'].isna())
-            recovered_val = int(df_recovered.loc[recovered_idx, date_col].values[0]) if len(df_recovered.loc[recovered_idx, date_col].values) > 0 else 0
-            
-            query = """
-                INSERT INTO covid_data (country, province, latitude, longitude, date, confirmed, deaths, recovered)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            """
-            
-            try:
-                cursor.execute(query, (country, province, latitude, longitude, parsed_date, confirmed, deaths_val, recovered_val))
-            except Exception as e:
-                pass
-        
-        if (idx + 1) % 50 == 0:
-            print(f"Processed {idx + 1} regions...")
-    
-    db.connection.commit()
-    cursor.close()
-    db.disconnect()
-    
+    with sync_phase("fetch", timings):
+        df_confirmed, df_deaths, df_recovered = load_all()
+
+    db = make_connection(allow_local_infile=use_load_data, pool_size=pool_size)
+    if not db.connect():
+        print("Failed to connect to the database")
+        return None
+
+    try:
+        pending = get_pending_checkpoint(db)
+        if full_refresh or staging:
+            since = None
+        elif pending is not None:
+            # MAX(date) may already include dates from the interrupted run's
+            # finished chunks, so keep its starting point to avoid leaving gaps
+            since = pending['since']
+        else:
+            since = get_max_synced_date(db)
+        if since is not None:
+            print(f"Incremental sync: loading dates after {since}")
+
+        dates = parse_date_columns(df_confirmed.columns[4:])
+        if since is not None:
+            dates = dates[dates > pd.Timestamp(since)]
+        chunk_regions = regions_per_chunk(len(dates), chunk_rows)
+        total_chunks = -(-len(df_confirmed) // chunk_regions)
+        run_key = sync_run_key((df_confirmed, df_deaths, df_recovered), since, chunk_regions, table)
+
+        start_chunk = 0
+        resumable = pending is not None and pending['run_key'] == run_key
+        if resumable and staging and not staging_tables_exist(db):
+            # Interrupted after the swap but before the checkpoint was completed
+            print("Staging tables from the interrupted sync are gone; starting over")
+            resumable = False
+        if resumable:
+            start_chunk = pending['chunks_done']
+            print(f"Resuming interrupted sync at chunk {start_chunk + 1}/{total_chunks}")
+        else:
+            if pending is not None:
+                discard_pending_checkpoints(db)
+            if staging:
+                create_staging_tables(db)
+
+        if dates.empty:
+            print("covid_data is already up to date")
+            stats = {"rows": 0, "failed": 0, "seconds": 0.0, "rows_per_sec": 0.0, "chunks": 0}
+        else:
+            save_checkpoint(db, run_key, since, start_chunk, total_chunks)
+            if workers > 1:
+                chunks = iter_covid_chunks_parallel(df_confirmed, df_deaths, df_recovered, since, chunk_regions, start_chunk, workers)
+            else:
+                chunks = iter_covid_chunks(df_confirmed, df_deaths, df_recovered, since, chunk_regions, start_chunk)
+            # At least one: a single-connection backend loads serially on this connection
+            load_workers = max(1, min(workers, db.pool_capacity() - 1))
+            print(f"Upserting {len(df_confirmed) * len(dates):,} rows into {table} in {total_chunks} chunks "
+                  f"({workers} reshape / {load_workers} load workers)...")
+            stats = load_chunks(db, chunks, run_key, since, start_chunk, total_chunks, chunk_size, use_load_data, load_workers, timings, table)
+
+        print("Refreshing aggregate tables...")
+        with sync_phase("aggregate", timings):
+            refresh_aggregates(db, since=since, suffix=suffix)
+        if staging and not dates.empty:
+            print("Swapping staging tables into place...")
+            with sync_phase("swap", timings):
+                swap_staging_tables(db)
+        # Readers key their caches on this version, so bump it only once everything is in place
+        bump_data_version(db)
+        if not dates.empty:
+            complete_checkpoint(db, run_key)
+    finally:
+        # Return the connection to the pool even if a phase fails
+        db.disconnect()
+
+    for name in ("reshape", "load"):
+        if name in timings:
+            metrics.observe("sync_phase", timings[name], phase=name)
+    stats["phases"] = timings
+    print("Phase timings: " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items()))
     print("Data sync complete!")
+    return stats
 
 if __name__ == "__main__":
     sync_covid_data()
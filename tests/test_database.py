@@ -0,0 +1,47 @@
+import datetime
+from decimal import Decimal
+
+import numpy as np
+from mysql.connector import FieldType
+
+from src.database import _column_array
+
+
+def test_integral_decimals_decode_to_int64():
+    values = _column_array((Decimal("3"), Decimal("12345678901234")), FieldType.NEWDECIMAL)
+    assert values.dtype == np.int64
+    assert values.tolist() == [3, 12345678901234]
+
+
+def test_fractional_decimals_decode_to_float64():
+    values = _column_array((Decimal("1.5"), Decimal("2.75")), FieldType.NEWDECIMAL)
+    assert values.dtype == np.float64
+    assert values.tolist() == [1.5, 2.75]
+
+
+def test_null_decimals_decode_to_nan():
+    values = _column_array((Decimal("1.5"), None), FieldType.NEWDECIMAL)
+    assert values.dtype == np.float64
+    assert values[0] == 1.5 and np.isnan(values[1])
+
+    values = _column_array((Decimal("2"), None), FieldType.DECIMAL)
+    assert values.dtype == np.float64
+    assert values[0] == 2 and np.isnan(values[1])
+
+
+def test_integers_and_floats():
+    assert _column_array((1, 2), FieldType.LONGLONG).dtype == np.int64
+    assert np.isnan(_column_array((1, None), FieldType.LONGLONG)[1])
+    assert _column_array((0.5, 1.0), FieldType.DOUBLE).tolist() == [0.5, 1.0]
+
+
+def test_dates():
+    values = _column_array((datetime.date(2020, 1, 22), datetime.date(2021, 3, 1)), FieldType.DATE)
+    assert values.dtype == np.dtype("datetime64[s]")
+    assert values.astype("datetime64[D]").astype(str).tolist() == ["2020-01-22", "2021-03-01"]
+    assert np.isnat(_column_array((datetime.date(2020, 1, 22), None), FieldType.DATE)[1])
+
+
+def test_empty_and_text_columns():
+    assert _column_array((), FieldType.NEWDECIMAL).dtype == np.int64
+    assert _column_array(("a", None), FieldType.VAR_STRING).tolist() == ["a", None]
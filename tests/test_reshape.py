@@ -0,0 +1,84 @@
+from pathlib import Path
+
+import pandas as pd
+
+from src.sync_data import reshape_covid_data
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def load_fixtures():
+    return [pd.read_csv(FIXTURES / f"{name}.csv") for name in ("confirmed", "deaths", "recovered")]
+
+
+def parse_date(date_str):
+    try:
+        return pd.to_datetime(date_str).strftime('%Y-%m-%d')
+    except:
+        return None
+
+
+def iterrows_reshape(df_confirmed, df_deaths, df_recovered):
+    # The per-row loop sync_covid_data ran before the vectorized reshape, minus the INSERT
+    rows = []
+    for idx, row in df_confirmed.iterrows():
+        country = row['Country/Region']
+        province = row['Province/State'] if pd.notna(row['Province/State']) else None
+        latitude = row['Lat'] if pd.notna(row['Lat']) else None
+        longitude = row['Long'] if pd.notna(row['Long']) else None
+
+        for date_col in df_confirmed.columns[4:]:
+            parsed_date = parse_date(date_col)
+            if not parsed_date:
+                continue
+
+            confirmed = int(row[date_col]) if pd.notna(row[date_col]) else 0
+
+            deaths_idx = (df_deaths['Country/Region'] == country) & (df_deaths['Province/State'] == province if pd.notna(province) else df_deaths['Province/State'].isna())
+            deaths_val = int(df_deaths.loc[deaths_idx, date_col].values[0]) if len(df_deaths.loc[deaths_idx, date_col].values) > 0 else 0
+
+            recovered_idx = (df_recovered['Country/Region'] == country) & (df_recovered['Province/State'] == province if pd.notna(province) else df_recovered['Province/State'].isna())
+            recovered_val = int(df_recovered.loc[recovered_idx, date_col].values[0]) if len(df_recovered.loc[recovered_idx, date_col].values) > 0 else 0
+
+            rows.append((country, province, latitude, longitude, parsed_date, confirmed, deaths_val, recovered_val))
+    return rows
+
+
+def frame_rows(frame):
+    rows = []
+    for country, province, latitude, longitude, date, confirmed, deaths, recovered in frame.iloc[:, :8].itertuples(index=False, name=None):
+        rows.append((
+            country,
+            None if pd.isna(province) else province,
+            None if pd.isna(latitude) else latitude,
+            None if pd.isna(longitude) else longitude,
+            date.strftime('%Y-%m-%d'),
+            int(confirmed),
+            int(deaths),
+            int(recovered)
+        ))
+    return rows
+
+
+def test_reshape_matches_iterrows_loop():
+    df_confirmed, df_deaths, df_recovered = load_fixtures()
+    expected = iterrows_reshape(df_confirmed, df_deaths, df_recovered)
+    assert frame_rows(reshape_covid_data(df_confirmed, df_deaths, df_recovered)) == expected
+
+
+def test_reshape_fixture_edge_cases():
+    df_confirmed, df_deaths, df_recovered = load_fixtures()
+    frame = reshape_covid_data(df_confirmed, df_deaths, df_recovered)
+    rows = frame_rows(frame)
+
+    # 5 regions, duplicates included, x 3 parseable dates; the "bad" header is skipped
+    assert len(rows) == 15
+    assert sorted(set(row[4] for row in rows)) == ["2020-01-22", "2020-01-23", "2020-01-24"]
+    # Blank count cells load as 0
+    assert ("Canada", "Alberta", 53.9333, -116.5765, "2020-01-24", 0, 3, 2) in rows
+    # Regions missing from deaths or recovered get 0 there
+    assert ("Nowhere", None, None, None, "2020-01-22", 1, 0, 0) in rows
+    assert ("Canada", "Ontario", 51.2538, -85.3232, "2020-01-24", 7, 2, 0) in rows
+    # Duplicate regions both load and match the first deaths row for their key
+    afghanistan = [row for row in rows if row[0] == "Afghanistan" and row[4] == "2020-01-22"]
+    assert [(row[5], row[6]) for row in afghanistan] == [(0, 0), (9, 0)]